@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+
+# Questions shown per round and per quiz
+BATCH_SIZE = 5
+QUIZ_LENGTH = 50
+
+# Aim for questions the learner answers correctly about this often
+TARGET_SUCCESS = 0.7
+TARGET_WIDTH = 0.2
+
+# Elo-style step sizes for learner ability and question difficulty (logit scale)
+ABILITY_STEP = 0.4
+DIFFICULTY_STEP = 0.05
+
+# Selection weight multipliers from the learner's own history of a question
+UNSEEN_WEIGHT = 1.0
+MISSED_WEIGHT = 1.5
+MASTERED_WEIGHT = 0.2
+
+
+class TopicArrays:
+    """
+    Precomputed arrays for one topic's question pool: bank indices, question IDs
+    and a shared difficulty estimate. Built once per process and shared by sessions.
+    """
+
+    def __init__(self, bank, topic, difficulty=None):
+        pool = bank.question_pool(topic)
+        self.bank = bank
+        self.topic = topic
+        self.indices = np.arange(pool.start, pool.start + pool.count, dtype=np.int32)
+        self.ids = [bank.question(int(index))["id"] for index in self.indices]
+        self.position = {qid: i for i, qid in enumerate(self.ids)}
+        self.difficulty = np.zeros(len(self.ids), dtype=np.float32)
+        if difficulty:
+            for qid, value in difficulty.items():
+                if qid in self.position:
+                    self.difficulty[self.position[qid]] = value
+
+    def __len__(self):
+        return len(self.ids)
+
+    def question(self, i):
+        return self.bank.question(int(self.indices[i]))
+
+
+def success_probability(ability, difficulty):
+    return 1.0 / (1.0 + np.exp(difficulty - ability))
+
+
+class AdaptiveQuizSession:
+    """
+    One learner working through a quiz on one topic, BATCH_SIZE questions at a time.
+    Each batch is sampled from the whole pool, weighted towards questions the
+    learner should get right about TARGET_SUCCESS of the time, towards questions
+    they missed before and away from ones they keep getting right.
+    """
+
+    def __init__(self, arrays, history, quiz_length=QUIZ_LENGTH, batch_size=BATCH_SIZE, seed=None):
+        self.arrays = arrays
+        self.quiz_length = min(quiz_length, len(arrays))
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.served = np.zeros(len(arrays), dtype=bool)
+        self.answered = 0
+        self.correct = 0
+        self.batch = []
+        self.ability = self._initial_ability(history)
+
+    def _initial_ability(self, history):
+        """Starting ability from the learner's past accuracy on this topic (smoothed)."""
+        attempts = correct = 0
+        for qid, (a, c) in history.items():
+            if qid in self.arrays.position:
+                attempts += a
+                correct += c
+        accuracy = (correct + 1) / (attempts + 2)
+        return math.log(accuracy / (1 - accuracy))
+
+    @property
+    def finished(self):
+        return self.answered >= self.quiz_length
+
+    def _weights(self, history):
+        arrays = self.arrays
+        probability = success_probability(self.ability, arrays.difficulty)
+        weights = np.exp(-((probability - TARGET_SUCCESS) ** 2) / (2 * TARGET_WIDTH ** 2))
+
+        # Only the questions this learner has history for need a per-question adjustment
+        for qid, (attempts, correct) in history.items():
+            i = arrays.position.get(qid)
+            if i is None or attempts == 0:
+                continue
+            weights[i] *= MISSED_WEIGHT if correct < attempts else MASTERED_WEIGHT
+        weights[self.served] = 0.0
+        return weights
+
+    def next_batch(self, history):
+        """Samples the next batch of questions (as dicts) and remembers it as the current batch."""
+        remaining = min(self.batch_size, self.quiz_length - self.answered)
+        weights = self._weights(history)
+        available = int(np.count_nonzero(weights))
+        if remaining <= 0 or available == 0:
+            self.batch = []
+            return []
+        chosen = self.rng.choice(len(weights), size=min(remaining, available), replace=False,
+                                 p=weights / weights.sum())
+        self.served[chosen] = True
+        self.batch = [int(i) for i in chosen]
+        return self.current_batch()
+
+    def current_batch(self):
+        return [self.arrays.question(i) for i in self.batch]
+
+    def record(self, question_id, correct):
+        """Updates learner ability and the shared difficulty estimate after one answer."""
+        i = self.arrays.position[question_id]
+        probability = float(success_probability(self.ability, self.arrays.difficulty[i]))
+        self.ability += ABILITY_STEP * (correct - probability)
+        self.arrays.difficulty[i] -= DIFFICULTY_STEP * (correct - probability)
+        self.answered += 1
+        self.correct += int(correct)
@@ -0,0 +1,247 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+
+# Defaults for the chatbot answer cache
+SIMILARITY_THRESHOLD = 0.8
+MAX_ENTRIES = 1000
+TTL_SECONDS = 7 * 24 * 3600
+EMBEDDING_DIM = 512
+
+# Weight of word-pair features, so "convert string to int" and "convert int to string" stay apart
+BIGRAM_WEIGHT = 1.5
+
+# New answers are written to disk at most this often (seconds), not on every put()
+SAVE_DELAY = 5.0
+
+# Words that carry no meaning for matching programming questions
+STOPWORDS = {
+    "a", "an", "the", "i", "do", "does", "how", "to", "in", "of", "is", "what",
+    "can", "you", "me", "my", "python", "please", "with", "for", "and", "on"
+}
+
+# Common learner shorthand, mapped to the word the embedding should see
+SYNONYMS = {
+    "var": "variable", "vars": "variable", "func": "function", "funcs": "function",
+    "fn": "function", "str": "string", "dict": "dictionary", "int": "integer",
+    "arg": "argument", "args": "argument", "param": "parameter", "params": "parameter",
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5"
+}
+
+
+def normalize_question(question):
+    """Lower-case, punctuation stripped, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+def content_words(text):
+    """Normalized content words: stopwords dropped, shorthand expanded, crudely stemmed."""
+    words = []
+    for word in normalize_question(text).split():
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        # Crude stemming: "adding"/"adds"/"variables" match "add"/"variable"
+        for suffix in ("ing", "s"):
+            if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        words.append(word)
+    return words
+
+
+class HashedBagOfWords:
+    """
+    Dependency-free embedding: content words, their character trigrams and
+    adjacent word pairs are hashed into a fixed-size vector, so "vars" still
+    overlaps with "variables" but word order is not ignored.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text):
+        words = content_words(text)
+        for word in words:
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}", BIGRAM_WEIGHT
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class LocalSentenceEmbedder:
+    """Wraps a sentence-transformers model stored on local disk (no downloads)."""
+
+    def __init__(self, model_path):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_path, device="cpu")
+
+    def embed(self, text):
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def get_embedder(model_path=None):
+    """Local sentence-transformers model if one is available, otherwise hashed bag-of-words."""
+    if model_path and os.path.isdir(model_path):
+        try:
+            return LocalSentenceEmbedder(model_path)
+        except ImportError:
+            pass
+    return HashedBagOfWords()
+
+
+class AnswerCache:
+    """
+    Two-tier cache in front of the chatbot model.
+    Tier 1 matches the normalized question text exactly; tier 2 returns the
+    answer of the most similar cached question if the cosine similarity of
+    their embeddings is at least `threshold`. Entries expire after `ttl`
+    seconds and the least recently used entry is evicted when full.
+    With a `path`, new answers are saved at most every `save_delay` seconds
+    (and at exit), so a burst of put() calls costs one write.
+    """
+
+    def __init__(self, embedder=None, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES,
+                 ttl=TTL_SECONDS, path=None, save_delay=SAVE_DELAY):
+        self.embedder = embedder or HashedBagOfWords()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()  # normalized question -> (answer, created_at, embedding)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.save_delay = save_delay
+        self._save_timer = None
+        self._keys = []
+        self._matrix = None
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        if path and os.path.exists(path):
+            self.load()
+        if path:
+            atexit.register(self.flush)
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _index(self):
+        """Embedding matrix aligned with self._keys, rebuilt only after the entries change."""
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            if self._keys:
+                self._matrix = np.stack([self.entries[key][2] for key in self._keys])
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+        return self._keys, self._matrix
+
+    def _remove(self, key):
+        del self.entries[key]
+        self._matrix = None
+
+    def get(self, question):
+        """Cached answer for the question (or a near-identical one), else None."""
+        key = normalize_question(question)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[1], now):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.counters["exact_hits"] += 1
+                return entry[0]
+
+            keys, matrix = self._index()
+            if keys:
+                similarities = matrix @ self.embedder.embed(question)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    match = keys[best]
+                    answer, created_at, _ = self.entries[match]
+                    if not self._expired(created_at, now):
+                        self.entries.move_to_end(match)
+                        self.counters["semantic_hits"] += 1
+                        return answer
+                    self._remove(match)
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, question, answer):
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+        with self.lock:
+            self.entries[key] = (answer, time.time(), self.embedder.embed(question))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+            if self.path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Saves now if answers were added since the last save."""
+        with self.lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self.save()
+
+    def stats(self):
+        with self.lock:
+            lookups = sum(self.counters.values())
+            hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+            return dict(self.counters, entries=len(self.entries),
+                        hit_rate=hits / lookups if lookups else 0.0)
+
+    def save(self):
+        """Persists answers (not embeddings, which are recomputed on load) atomically."""
+        with self.save_lock:
+            with self.lock:
+                data = [{"question": key, "answer": answer, "created_at": created_at}
+                        for key, (answer, created_at, _) in self.entries.items()]
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+                metrics.inc("app_file_bytes_total", f.tell(), store="answer_cache", op="write")
+            os.chmod(tmp_path, 0o644)  # mkstemp creates it 0600
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        now = time.time()
+        with self.lock:
+            for item in data[-self.max_entries:]:
+                if not self._expired(item["created_at"], now):
+                    self.entries[item["question"]] = (item["answer"], item["created_at"],
+                                                      self.embedder.embed(item["question"]))
+            self._matrix = None
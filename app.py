@@ -1,14 +1,28 @@
 import streamlit as st
-import json
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import logging
 import os
-from datetime import datetime, timedelta
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from datetime import date, datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 
-import torch
 import time
 import hashlib
 
+from content_store import ContentStore
+from quiz_bank import QuizBank, ensure_quiz_bank
+from progress_store import ProgressSession, get_progress_backend
+from progress_view import progress_view
+from badge_rules import DAY_ROLLED, LESSON_COMPLETED, QUIZ_SUBMITTED, RulesEngine, day_rolled
+import metrics
+
+# Chatbot timings and token counts are logged at INFO (APP_LOG_LEVEL); with metrics on they are also recorded
+logger = logging.getLogger("app")
+if not logger.handlers:  # The script reruns; configure once per process
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(log_handler)
+    logger.setLevel(os.environ.get("APP_LOG_LEVEL", "INFO"))
+
 
 # Check if the page is app.py and hide menu
 if "current_page" in st.session_state and st.session_state["current_page"] == "app":
@@ -37,221 +51,68 @@ if "username" not in st.session_state:
 if not st.session_state["logged_in"]:
     st.switch_page("pages/1_register.py")
 
+# Timings, I/O and token counters, slow-rerun profiles (see metrics.py).
+# Everything is a no-op unless APP_METRICS, APP_METRICS_FILE or APP_METRICS_PORT is set.
+@st.cache_resource
+def load_metrics():
+    from progress_store import get_write_counters
+    metrics.add_collector(lambda: [("progress_writes_total", "counter", {"result": result}, count)
+                                   for result, count in get_write_counters().items()])
+    metrics.start_exporters()
+
+if metrics.ENABLED:
+    load_metrics()
+rerun = metrics.start_rerun(get_script_run_ctx().session_id if metrics.ENABLED else None)
 
 
 
 
 
 
-# Sidebar with purple-pink gradient and larger menu
-st.markdown(
-    """
-    <style>
-    /* Hover effect for lesson and quiz cards */
-.lesson-card, .quiz-card {
-    background-color: #2d1b5a;
-    border-radius: 15px;
-    padding: 20px;
-    transition: transform 0.3s ease, box-shadow 0.3s ease;
-    cursor: pointer;
-}
-
-.lesson-card:hover, .quiz-card:hover {
-    transform: translateY(-10px);
-    box-shadow: 0 10px 20px rgba(255, 255, 255, 0.2);
-}
-
-    /* Sidebar (menu area) background with gradient */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(135deg, #5b2c98, #c33764) !important;  /* Purple to pink gradient */
-        border-right: 3px solid #000000;  /* Black border */
-        color: #000000;  /* Black text */
-        padding: 30px;  /* Increased padding for a larger menu */
-        font-size: 20px;  /* Larger font size */
-        width: 300px;  /* Increase sidebar width */
-    }
-
-    /* Remove any glowing or shadows */
-    * {
-        box-shadow: none !important;
-        text-shadow: none !important;
-    }
-
-    /* Sidebar menu item styles */
-    [data-testid="stSidebar"] .css-1v0mbdj, [data-testid="stSidebar"] .css-1v0mbdj:hover {
-        background-color: transparent;
-        color: #000000 !important;  /* Black text for menu items */
-    }
-
-    /* Main app background */
-    .stApp {
-        background: linear-gradient(135deg, #1b0c3b, #000000);  /* Deep purple to black */
-    }
-
-    /* Header text style for 'AI Tutor for Programming' */
-    h1 {
-        color: #000000;
-        font-weight: 900;
-        text-shadow: none;
-    }
-
-    /* Lesson headers */
-    h2 {
-        color: #ffffff;
-        font-weight: bold;
-    }
-
-     /* Animated streak counter */
-    .streak-counter {
-        font-size: 36px;
-        font-weight: bold;
-        color: #FFD700;
-        text-align: center;
-        animation: pop 0.5s ease-in-out infinite alternate;
-    }
-
-    @keyframes pop {
-        from {
-            transform: scale(1);
-        }
-        to {
-            transform: scale(1.1);
-        }
-    }
-    /* Badge Unlock Notification */
-    .badge-popup {
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        background-color: #4CAF50;  /* Green background */
-        color: white;
-        padding: 15px 20px;
-        border-radius: 12px;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
-        font-size: 18px;
-        animation: slideIn 0.5s ease-out, fadeOut 0.5s ease-in 4s forwards;
-        z-index: 1000;
-    }
-
-    /* Slide-in animation */
-    @keyframes slideIn {
-        from {
-            transform: translateX(100%);
-        }
-        to {
-            transform: translateX(0);
-        }
-    }
-
-    /* Fade-out animation */
-    @keyframes fadeOut {
-        to {
-            opacity: 0;
-            visibility: hidden;
-        }
-    }
-    input, textarea {
-        background: linear-gradient(145deg, #2d1b5a, #3a1d6e);
-        border-radius: 10px;
-        padding: 10px;
-        color: #fff;
-        border: none;
-        box-shadow: 3px 3px 5px #1b1033, -3px -3px 5px #3a1d6e;
-    }
-
-    button {
-        background-color: #6c5ce7;
-        border-radius: 10px;
-        padding: 10px 20px;
-        color: #fff;
-        font-weight: bold;
-        transition: all 0.3s ease;
-        border: none;
-    }
-    button:hover {
-        background-color: #a29bfe;
-        box-shadow: 0 8px 16px rgba(108, 92, 231, 0.4);
-        transform: translateY(-3px);
-    }
-
-    @keyframes typing {
-        from { width: 0 }
-        to { width: 100% }
-    }
-
-    h1 {
-        overflow: hidden;
-        white-space: nowrap;
-        border-right: 3px solid #fff;
-        width: 0;
-        animation: typing 3s steps(30, end) forwards;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# Load and Save JSON Data
-def load_json(file_path):
-    with open(file_path, 'r') as file:
-        return json.load(file)
-
-def save_json(data, file_path):
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4)
-
-# Initialize Progress File if Missing
-progress_file = "user_data/progress.json"
-if not os.path.exists(progress_file):
-    initial_data = {
-        "completed_lessons": [],
-        "quiz_scores": {},
-        "last_learning_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "streak_count": 1,
-        "badges": [],
-        "learning_goal": {}
-    }
-    os.makedirs(os.path.dirname(progress_file), exist_ok=True)  # Create user_data directory if it doesn't exist
-    save_json(initial_data, progress_file)
-else:
-    # If the file exists, load and check for missing keys
-    progress = load_json(progress_file)
-    if "badges" not in progress:
-        progress["badges"] = []
-    if "learning_goal" not in progress:
-        progress["learning_goal"] = {}
-    if "quiz_scores" not in progress:
-        progress["quiz_scores"] = {}
-    save_json(progress, progress_file)
+
+# Page styles (purple-pink gradient sidebar, cards, streak counter) live in app.css and
+# are read once per process. Streamlit removes any element a rerun doesn't emit again,
+# so the <style> tag is still sent each run, as a single prebuilt string.
+@st.cache_resource
+def load_page_css():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.css"), "r", encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+with metrics.timer("app_stage_seconds", stage="css"):
+    st.markdown(load_page_css(), unsafe_allow_html=True)
+
+# Progress Storage (one backend per server process, keyed by username)
+@st.cache_resource
+def load_progress_backend():
+    return get_progress_backend()
+
+progress_backend = load_progress_backend()
+username = st.session_state["username"]
+
+# Flush anything an interrupted rerun left behind, then start this run's session.
+# All progress mutations made during the run are written once, at the end of the script.
+if "progress_session" in st.session_state:
+    st.session_state["progress_session"].flush()
+with metrics.timer("app_stage_seconds", stage="progress_load"):
+    progress_session = ProgressSession(progress_backend, username)
+st.session_state["progress_session"] = progress_session
 
 # Load Progress
-progress = load_json(progress_file)
+progress = progress_session.progress
 
 
 
-# Streak System
-def update_streak():
-    try:
-        # Try parsing with timestamp format
-        last_learning_time = datetime.strptime(progress["last_learning_time"], "%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        # Fallback to date-only format
-        last_learning_time = datetime.strptime(progress["last_learning_time"], "%Y-%m-%d")
-    
-    today = datetime.now().date()
-    if last_learning_time.date() == today:
-        return  # Already interacted today
+# Badges and Streak: each rule runs only when an event it subscribes to fires
+@st.cache_resource
+def load_rules_engine():
+    return RulesEngine()
 
-    # Check if yesterday was the last learning day
-    if (today - last_learning_time.date()).days == 1:
-        progress["streak_count"] += 1
-    else:
-        progress["streak_count"] = 1  # Reset streak
+def fire_event(event, **data):
+    with metrics.timer("app_stage_seconds", stage="badge_rules"):
+        unlocked = load_rules_engine().fire(progress_session, event, **data)
+    st.session_state.setdefault("new_badges", []).extend(unlocked)
 
-    # Update last learning time
-    progress["last_learning_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    save_json(progress, progress_file)
-  # Display the pop-up notification
+# Display the pop-up notification
 def show_badge_popup(badge_name):
     st.markdown(
         f"""
@@ -261,136 +122,296 @@ def show_badge_popup(badge_name):
         """,
         unsafe_allow_html=True
     )
-# Badge System
-def check_badges():
-    # Ensure the 'badges' key exists
-    if "badges" not in progress:
-        progress["badges"] = []
-
-    badges = progress["badges"]
-    if "Lesson Master" not in badges:
-        badges.append("Lesson Master")
-        show_badge_popup("Lesson Master")
-
-    # Badge: Complete all lessons
-    if len(progress["completed_lessons"]) == len(lessons) and "Lesson Master" not in badges:
-        badges.append("Lesson Master")
-
-    # Badge: Score 100% on a quiz
-    for score in progress["quiz_scores"].values():
-        if score == 100 and "Quiz Champ" not in badges:
-            badges.append("Quiz Champ")
-            break
-
-    # Badge: Maintain a streak of 7 days
-    if progress["streak_count"] >= 7 and "Streak Star" not in badges:
-        badges.append("Streak Star")
-
-    progress["badges"] = badges
-    save_json(progress, progress_file)
-
-    # Animated Streak Counter
-def live_streak_counter(streak_count):
-    streak_placeholder = st.empty()
-    for _ in range(10):  # Simulate a live update (for demo purposes)
-        streak_placeholder.markdown(
-            f"<div class='streak-counter'>Streak: {streak_count} Days 🔥</div>",
-            unsafe_allow_html=True
-        )
 
+def show_new_badges():
+    for badge in st.session_state.pop("new_badges", []):
+        show_badge_popup(badge)
+
+    # Streak Counter
+def live_streak_counter(streak_count):
+    st.markdown(
+        f"<div class='streak-counter'>Streak: {streak_count} Days 🔥</div>",
+        unsafe_allow_html=True
+    )
 
-# Hugging Face Model Initialization
-@st.cache_resource
-def load_hugging_face_model():
-    model_name = "Salesforce/codegen-350M-mono"  # Programming-specific model
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float16)
-    return tokenizer, model
 
-tokenizer, model = load_hugging_face_model()
+# Chatbot Inference Worker (one model process shared by every session).
+# Nothing from the ML stack is imported until the Chatbot is first used.
+def get_inference_client():
+    from inference_server import get_shared_client
+    return get_shared_client()
 
 # Clean Response Function
-def clean_response(response):
-    lines = response.split("\n")
+def clean_stream(chunks):
+    """
+    Cleans a streamed response: yields the cleaned text so far each time a
+    chunk arrives. Duplicate lines are dropped as soon as they complete.
+    """
     cleaned_lines = []
-    for line in lines:
-        line = line.strip()
-        if line and line not in cleaned_lines:
-            cleaned_lines.append(line)
-    return "\n".join(cleaned_lines)
-
-# Get Hugging Face Response
-def get_hf_response(question):
-    prompt = (
-        "You are a Python programming assistant. Provide accurate answers to questions about Python and include examples. "
-        "For example:\n\n"
-        "Q: How do I add two variables in Python?\n"
-        "A: To add two variables in Python, you can use the + operator. For example:\n"
-        "```python\n"
-        "a = 5\n"
-        "b = 10\n"
-        "c = a + b\n"
-        "print(c)  # Output: 15\n"
-        "```\n\n"
-        f"Q: {question}\n"
-        "A:"
+    seen_lines = set()
+    partial = ""
+    for chunk in chunks:
+        partial += chunk
+        *complete_lines, partial = partial.split("\n")
+        for line in complete_lines:
+            line = line.strip()
+            if line and line not in seen_lines:
+                seen_lines.add(line)
+                cleaned_lines.append(line)
+        current = partial.strip()
+        if current and current not in seen_lines:
+            yield "\n".join(cleaned_lines + [current])
+        else:
+            yield "\n".join(cleaned_lines)
+
+# Answer Cache (exact + near-duplicate questions, shared across sessions)
+@st.cache_resource
+def load_answer_cache():
+    from answer_cache import SIMILARITY_THRESHOLD, AnswerCache, get_embedder
+    cache = AnswerCache(
+        embedder=get_embedder(os.environ.get("ANSWER_CACHE_EMBEDDING_MODEL")),
+        threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", SIMILARITY_THRESHOLD)),
+        path=os.environ.get("ANSWER_CACHE_FILE", "user_data/answer_cache.json")
     )
-    inputs = tokenizer(prompt, return_tensors="pt")
-    with torch.no_grad():
-        outputs = model.generate(
-            inputs["input_ids"],
-            max_length=250,
-            num_return_sequences=1,
-            repetition_penalty=1.2,
-            temperature=0.7,
-        )
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return clean_response(response.split("A:")[-1].strip())
+    metrics.add_collector(lambda: [("answer_cache_lookups_total", "counter", {"result": result}, count)
+                                   for result, count in cache.stats().items() if result.endswith(("hits", "misses"))])
+    return cache
+
+# Lesson retrieval index (persisted next to the master file, updated when it changes)
+@st.cache_resource
+def load_lesson_index():
+    from lesson_index import LessonIndex
+    embedder = None
+    if os.environ.get("LESSON_INDEX_DENSE") == "1":
+        from answer_cache import get_embedder
+        embedder = get_embedder(os.environ.get("ANSWER_CACHE_EMBEDDING_MODEL"))
+    index = LessonIndex(embedder=embedder)
+    index.update()
+    return index
+
+def lesson_context(question, lesson_index, k=2):
+    """Top lesson passages for a question, formatted for the chatbot prompt."""
+    from lesson_index import format_context
+    lesson_index.update()
+    return format_context(lesson_index.search(question, k=k))
+
+# Get Hugging Face Response (runs on a job thread: shared resources are passed in)
+def get_hf_response(question, answer_cache, lesson_index):
+    """Yields the cleaned answer so far as the model streams tokens."""
+    cached = answer_cache.get(question)
+    if cached is not None:
+        metrics.inc("chatbot_answers_total", source="cache")
+        yield cached
+        return
+
+    start = time.perf_counter()
+    first_token_time = None
+    cleaned = ""
+    context = lesson_context(question, lesson_index)
+    for cleaned in clean_stream(get_inference_client().stream(question, context=context)):
+        if first_token_time is None:
+            first_token_time = time.perf_counter() - start
+        yield cleaned
+    total_time = time.perf_counter() - start
+    logger.info("Chatbot answer: time to first token %.2fs, total %.2fs", first_token_time or total_time, total_time)
+    metrics.inc("chatbot_answers_total", source="model")
+    metrics.observe("chatbot_first_token_seconds", first_token_time or total_time)
+    metrics.observe("chatbot_answer_seconds", total_time)
+    answer_cache.put(question, cleaned)
+
+# Background Jobs: long-running work runs here, script runs only read its status
+@st.cache_resource
+def load_job_queue():
+    from job_queue import JobQueue
+    jobs = JobQueue()
+    metrics.add_collector(lambda: [("jobs", "gauge", {"status": status}, count)
+                                   for status, count in jobs.stats().items()])
+    return jobs
+
+def chatbot_job(report, question, answer_cache, lesson_index):
+    report(message="Waiting for the model...")
+    answer = ""
+    for answer in get_hf_response(question, answer_cache, lesson_index):
+        report(partial=answer)
+    return answer
+
+# Polls the chatbot job without holding the script thread; a full rerun stops polling once it is done
+@st.fragment(run_every=0.5)
+def show_chatbot_job():
+    from job_queue import DONE, FAILED
+    job = load_job_queue().status(st.session_state["chatbot_job"])
+    if job is None or job["status"] in (DONE, FAILED):
+        del st.session_state["chatbot_job"]
+        if job is None:
+            st.session_state["chatbot_response"] = ("error", "The answer expired, please ask again.")
+        elif job["status"] == DONE:
+            st.session_state["chatbot_response"] = ("answer", job["result"])
+        else:
+            st.session_state["chatbot_response"] = ("error", f"Couldn't get an answer: {job['error']}")
+        st.rerun()
+    st.write("**AI Response:**")
+    st.write(job["partial"] or job["message"] or "Queued...")
 
 # Check User Answers
 def check_answers(questions, user_answers):
-    score = 0
-    for i, question in enumerate(questions):
-        if user_answers[i] == question["answer"]:
-            score += 1
-    return score
+    """Correctness of each answer in a submitted round."""
+    return [answer == question["answer"] for question, answer in zip(questions, user_answers)]
 
 # Lessons and Quizzes
 lessons = [
-    {"title": "Introduction to Python", "file": "lessons/intro_to_python.json"},
-    {"title": "Variables and Data Types", "file": "lessons/variables_and_data_types.json"},
-    {"title": "Conditionals in Python", "file": "lessons/conditionals.json"},
-    {"title": "Loops in Python", "file": "lessons/loops.json"},
-    {"title": "Functions in Python", "file": "lessons/functions.json"}
+    {"title": "Introduction to Python", "topic": "Introduction to Python"},
+    {"title": "Variables and Data Types", "topic": "Variables and Data Types"},
+    {"title": "Conditionals in Python", "topic": "Conditionals"},
+    {"title": "Loops in Python", "topic": "Loops"},
+    {"title": "Functions in Python", "topic": "Functions"}
 ]
 
 quizzes = [
-    {"title": "Quiz: Introduction to Python", "file": "quizzes/intro_to_python_quiz.json"},
-    {"title": "Quiz: Variables and Data Types", "file": "quizzes/variables_and_data_types_quiz.json"},
-    {"title": "Quiz: Conditionals", "file": "quizzes/conditionals_quiz.json"},
-    {"title": "Quiz: Loops", "file": "quizzes/loops_quiz.json"},
-    {"title": "Quiz: Functions", "file": "quizzes/functions_quiz.json"}
+    {"title": "Quiz: Introduction to Python", "topic": "Introduction to Python"},
+    {"title": "Quiz: Variables and Data Types", "topic": "Variables and Data Types"},
+    {"title": "Quiz: Conditionals", "topic": "Conditionals"},
+    {"title": "Quiz: Loops", "topic": "Loops"},
+    {"title": "Quiz: Functions", "topic": "Functions"}
 ]
 
-# App Layout
-st.title("AI Tutor for Programming in python")
 
-# Update streak and badges
-update_streak()
-check_badges()
-# Display the pop-up notification
-def show_badge_popup(badge_name):
-    st.markdown(
-        f"""
-        <div class="badge-popup">
-            🎉 New Badge Unlocked: <strong>{badge_name}</strong>!
-        </div>
-        """,
-        unsafe_allow_html=True
+# Content Store (parsed once per server process, shared across sessions)
+@st.cache_resource
+def load_content_store():
+    return ContentStore(quizzes_file=None)
+
+# Quiz Bank (memory-mapped, so every worker process shares the same pages)
+@st.cache_resource
+def load_quiz_bank():
+    return QuizBank(ensure_quiz_bank())
+
+# Rendered lesson HTML, keyed by content hash: every lesson in the master is
+# pre-rendered into a memory-mapped file that all worker processes share
+@st.cache_resource
+def load_lesson_renderer():
+    from lesson_render import MappedLessonCache, ensure_lesson_cache
+    renderer = MappedLessonCache(ensure_lesson_cache(menu=lessons))
+    metrics.add_collector(lambda: [("lesson_render_lookups_total", "counter", {"result": "hit"}, renderer.hits),
+                                   ("lesson_render_lookups_total", "counter", {"result": "miss"}, renderer.misses)])
+    return renderer
+
+content_store = load_content_store()
+quiz_bank = load_quiz_bank()
+
+# Attempt log: every answer from every learner, appended as it is submitted
+@st.cache_resource
+def load_attempt_log():
+    from attempt_log import AttemptLog
+    return AttemptLog()
+
+# Precomputed analytics (python quiz_analytics.py); reloaded when the file changes
+@st.cache_data
+def load_quiz_analytics(mtime):
+    from quiz_analytics import load_report
+    return load_report()
+
+def quiz_analytics():
+    from quiz_analytics import ANALYTICS_FILE
+    if not os.path.exists(ANALYTICS_FILE):
+        return None
+    return load_quiz_analytics(os.path.getmtime(ANALYTICS_FILE))
+
+# Per-topic arrays for the adaptive quiz sampler (shared across sessions),
+# seeded with question difficulty from the analytics when they exist
+@st.cache_resource
+def load_topic_arrays(topic):
+    from adaptive_quiz import TopicArrays
+    analytics = quiz_analytics()
+    difficulty = None
+    if analytics:
+        difficulty = {qid: stats["difficulty"] for qid, stats in analytics["questions"].items()}
+    return TopicArrays(quiz_bank, topic, difficulty)
+
+# Search index over lessons and questions (prebuilt file, memory-mapped and shared across sessions)
+@st.cache_resource
+def load_search_index():
+    from search_index import SearchIndex, ensure_search_index
+    return SearchIndex(ensure_search_index())
+
+# Spaced-repetition queues for every learner (shared across sessions)
+@st.cache_resource
+def load_review_index():
+    from review_scheduler import ReviewIndex
+    return ReviewIndex()
+
+def find_question(question_id):
+    """Returns (topic, question) for a question ID, or (None, None) if it is no longer in the bank."""
+    for quiz in quizzes:
+        arrays = load_topic_arrays(quiz["topic"])
+        if question_id in arrays.position:
+            return quiz["topic"], arrays.question(arrays.position[question_id])
+    return None, None
+
+def due_review_batch(limit):
+    """Due question IDs; cards whose question left the bank (e.g. merged as a duplicate) are dropped."""
+    while True:
+        batch = load_review_index().due(username, limit=limit)
+        missing = [qid for qid in batch if find_question(qid)[1] is None]
+        if not missing:
+            return batch
+        load_review_index().forget(username, missing)
+
+def render_questions(questions):
+    """Shows one round of questions and returns the selected answers."""
+    user_answers = []
+    for question in questions:
+        st.write(question["question"])
+        user_answers.append(st.radio("Select an answer:", question["options"], key=question["id"]))
+    return user_answers
+
+def record_round(questions, topics, user_answers):
+    """Stores one submitted round everywhere it is tracked and returns per-question correctness."""
+    results = check_answers(questions, user_answers)
+    review_index = load_review_index()
+    for question, correct in zip(questions, results):
+        progress_session.record_answer(question["id"], correct)
+        stored_card = progress["review_cards"].get(question["id"])
+        card = review_index.record(username, question["id"], correct, stored_card=stored_card)
+        progress_session.set_review_card(question["id"], card)
+    load_attempt_log().append(
+        username, [(question["id"], topic, correct) for question, topic, correct in zip(questions, topics, results)]
     )
+    return results
+
+# App Layout
+st.title("AI Tutor for Programming in python")
 
+# Update the streak on the first visit of the day; show badges unlocked before a rerun
+if day_rolled(progress):
+    fire_event(DAY_ROLLED, today=date.today())
+show_new_badges()
+
+
+menu = st.sidebar.radio("Menu", ["📚Lesson", "💡Quiz", "🔁Review", "⌛Set Learning Goal", "📈Progress","💬Chatbot"])
+metrics.label_rerun(rerun, menu=menu)
+
+# Search box: results are shown above the selected page
+search_query = st.sidebar.text_input("🔍 Search lessons and quizzes")
+if search_query.strip():
+    with metrics.timer("app_stage_seconds", stage="search"):
+        search_results = load_search_index().search(search_query, k=10)
+    st.subheader(f"Search results for \"{search_query}\"")
+    if not search_results:
+        st.write("No matches found.")
+    for result in search_results:
+        if result["kind"] == "lesson":
+            # The index may have been rebuilt from a newer master file than this process loaded
+            lesson = content_store.lesson_by_id(result["ref"])
+            if lesson is None:
+                continue
+            with st.expander(f"📚 {result['title']} ({result['topic']})"):
+                st.markdown(load_lesson_renderer().get(lesson, result["title"]), unsafe_allow_html=True)
+        else:
+            st.markdown(f"💡 **{result['title']}**  \n{result['snippet']}")
+    st.divider()
 
-menu = st.sidebar.radio("Menu", ["📚Lesson", "💡Quiz", "⌛Set Learning Goal", "📈Progress","💬Chatbot"])
+# Load this learner's review queue from their stored cards, taking any changed by another app process
+load_review_index().queue(username, progress["review_cards"])
 
 # Set Learning Goal
 # Set Learning Goal
@@ -401,121 +422,179 @@ if menu == "⌛Set Learning Goal":
     duration = st.number_input("⏳ How many days do you want to complete it in?", min_value=1, max_value=30, value=14)
 
     if st.button("Set Goal"):
-        with st.spinner('Setting your goal...'):
-            progress_bar = st.progress(0)
-            for percent_complete in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(percent_complete + 1)
-            
-            # ✅ Clear the progress bar after completion
-            time.sleep(2)  # Wait for 1 second before clearing
-            progress_bar.empty()
-
         start_date = datetime.now()
         end_date = start_date + timedelta(days=duration)
         lesson_plan = [lesson["title"] for lesson in lessons]
 
-        progress["learning_goal"] = {
+        progress_session.set_learning_goal({
             "goal_description": goal_description,
             "start_date": start_date.strftime("%Y-%m-%d"),
             "end_date": end_date.strftime("%Y-%m-%d"),
             "lesson_plan": lesson_plan,
             "completed_lessons": []
-        }
-        save_json(progress, progress_file)
+        })
         st.success(f"🎯 Goal set: **{goal_description}** by **{end_date.strftime('%Y-%m-%d')}**")
 
 
 # Lessons Section
 elif menu == "📚Lesson":
     selected_lesson = st.selectbox("Select a Lesson", [lesson["title"] for lesson in lessons])
-    lesson_file = next(lesson["file"] for lesson in lessons if lesson["title"] == selected_lesson)
-    lesson = load_json(lesson_file)
-    
-    # Wrap the lesson content with a styled div
-    st.markdown(f"<div class='lesson-card'><h2>{lesson['title']}</h2>", unsafe_allow_html=True)
-    for paragraph in lesson["content"]:
-        st.markdown(f"<p>{paragraph}</p>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    lesson_topic = next(lesson["topic"] for lesson in lessons if lesson["title"] == selected_lesson)
+    lesson = content_store.lesson(lesson_topic)
+
+    if lesson is None:
+        st.warning("No content has been generated for this lesson yet.")
+    else:
+        # The whole lesson is one pre-rendered, escaped HTML fragment
+        with metrics.timer("app_stage_seconds", stage="lesson_render"):
+            st.markdown(load_lesson_renderer().get(lesson, selected_lesson), unsafe_allow_html=True)
 
 
     if st.button("Mark as Completed"):
-        if selected_lesson not in progress["completed_lessons"]:
-            progress["completed_lessons"].append(selected_lesson)
-            save_json(progress, progress_file)
+        if progress_session.complete_lesson(selected_lesson):
             st.success(f"'{selected_lesson}' marked as completed!")
-        earned_badges = progress.get("earned_badges", [])
+            fire_event(LESSON_COMPLETED, lesson=selected_lesson, all_lessons=[lesson["title"] for lesson in lessons])
+            show_new_badges()
 
     
 # Quizzes Section
 elif menu == "💡Quiz":
+    from adaptive_quiz import AdaptiveQuizSession
+
     selected_quiz = st.selectbox("Select a Quiz", [quiz["title"] for quiz in quizzes])
-    quiz_file = next(quiz["file"] for quiz in quizzes if quiz["title"] == selected_quiz)
-    quiz = load_json(quiz_file)
+    quiz_topic = next(quiz["topic"] for quiz in quizzes if quiz["title"] == selected_quiz)
 
     # Check if the corresponding lesson is completed
-    required_lesson = selected_quiz.lower().replace("quiz: ", "").strip()
-    if required_lesson in [lesson.lower() for lesson in progress["completed_lessons"]]:
+    required_lesson = next(lesson["title"] for lesson in lessons if lesson["topic"] == quiz_topic)
+    if required_lesson not in progress["completed_lessons"]:
+        st.warning("Complete the corresponding lesson first.")
+    elif len(load_topic_arrays(quiz_topic)) == 0:
+        st.info("No questions are available for this topic yet.")
+    else:
         st.markdown(f"<div class='quiz-card'>{selected_quiz}</div>", unsafe_allow_html=True)
 
-        user_answers = []
-        for question in quiz["questions"]:
-            st.write(question["question"])
-            options = question["options"]
-            user_answers.append(st.radio("Select an answer:", options, key=question["question"]))
-
-        if st.button("Submit Quiz"):
-            score = check_answers(quiz["questions"], user_answers)
-            st.success(f"Your Score: {score}/{len(quiz['questions'])}")
-
-            progress["quiz_scores"][selected_quiz.lower().replace(" ", "_")] = score
-            save_json(progress, progress_file)
+        # One adaptive session per topic; only the current batch is rendered
+        session_key = f"adaptive_quiz:{quiz_topic}"
+        quiz_session = st.session_state.get(session_key)
+        if quiz_session is None:
+            quiz_session = AdaptiveQuizSession(load_topic_arrays(quiz_topic), progress["question_history"])
+            quiz_session.next_batch(progress["question_history"])
+            st.session_state[session_key] = quiz_session
+
+        if "quiz_feedback" in st.session_state:
+            st.info(st.session_state.pop("quiz_feedback"))
+
+        if not quiz_session.finished:
+            questions = quiz_session.current_batch()
+            st.caption(f"Questions {quiz_session.answered + 1}-{quiz_session.answered + len(questions)} "
+                       f"of {quiz_session.quiz_length}")
+            user_answers = render_questions(questions)
+
+            if st.button("Submit Answers"):
+                results = record_round(questions, [quiz_topic] * len(questions), user_answers)
+                for question, correct in zip(questions, results):
+                    quiz_session.record(question["id"], correct)
+                st.session_state["quiz_feedback"] = (
+                    f"You got {sum(results)}/{len(questions)} right in that round."
+                )
+
+                if quiz_session.finished:
+                    quiz_key = selected_quiz.lower().replace(" ", "_")
+                    progress_session.set_quiz_score(quiz_key, quiz_session.correct)
+                    fire_event(QUIZ_SUBMITTED, quiz=quiz_key, score=quiz_session.correct,
+                               total=quiz_session.answered)
+                else:
+                    quiz_session.next_batch(progress["question_history"])
+                st.rerun()
+        else:
+            score = quiz_session.correct
+            st.success(f"Your Score: {score}/{quiz_session.answered}")
 
-            if score == len(quiz["questions"]):
+            if score == quiz_session.answered:
                 st.write("Great job! You can move to a higher difficulty level.")
-            elif score >= len(quiz["questions"]) // 2:
+            elif score >= quiz_session.answered // 2:
                 st.write("Good work! Keep practicing to improve.")
             else:
                 st.write("Don't worry! Review the lesson and try again.")
+
+            if st.button("Start a New Quiz"):
+                del st.session_state[session_key]
+                st.rerun()
+
+# Review Section: questions whose spaced-repetition due date has passed
+elif menu == "🔁Review":
+    from adaptive_quiz import BATCH_SIZE
+
+    st.header("Review")
+    if "review_feedback" in st.session_state:
+        st.info(st.session_state.pop("review_feedback"))
+
+    # Keep the same round across reruns until it is submitted
+    if not st.session_state.get("review_batch"):
+        st.session_state["review_batch"] = due_review_batch(BATCH_SIZE)
+    review_round = [find_question(qid) for qid in st.session_state["review_batch"]]
+    review_round = [(topic, question) for topic, question in review_round if question is not None]
+
+    if not review_round:
+        st.session_state.pop("review_batch")
+        next_due = load_review_index().next_due(username)
+        if next_due is None:
+            st.write("Nothing to review yet. Take a quiz to start your review schedule.")
+        else:
+            st.success(f"All caught up! Next review is due {datetime.fromtimestamp(next_due).strftime('%Y-%m-%d %H:%M')}.")
     else:
-        st.warning("Complete the corresponding lesson first.")
+        topics = [topic for topic, _ in review_round]
+        questions = [question for _, question in review_round]
+        user_answers = render_questions(questions)
+
+        if st.button("Submit Answers"):
+            results = record_round(questions, topics, user_answers)
+            st.session_state["review_feedback"] = f"You got {sum(results)}/{len(questions)} right in that review."
+            del st.session_state["review_batch"]
+            st.rerun()
 
 elif menu == "📈Progress":
     st.header("Your Learning Progress")
-    
-    if "learning_goal" in progress and progress["learning_goal"]:
-        goal = progress["learning_goal"]
-        st.write(f"**Goal**: {goal['goal_description']}")
-        st.write(f"**Deadline**: {goal['end_date']}")
-        remaining_lessons = [lesson for lesson in goal["lesson_plan"] if lesson not in progress["completed_lessons"]]
-        st.write("**Remaining Lessons**:")
-        for lesson in remaining_lessons:
-            st.write(f"- {lesson}")
-
-        days_left = (datetime.strptime(goal["end_date"], "%Y-%m-%d") - datetime.now()).days
-        if days_left < len(remaining_lessons):
-            st.warning(f"You are behind schedule! {len(remaining_lessons)} lessons remain, but only {days_left} days left.")
+
+    # Derived view of the progress record, rebuilt only when the record (or the day) changes
+    view = progress_view(progress, st.session_state.get("progress_view"))
+    st.session_state["progress_view"] = view
+
+    if view.deadline:
+        remaining = "".join(f"\n- {lesson}" for lesson in view.remaining_lessons)
+        st.markdown(f"**Goal**: {view.goal_description}  \n**Deadline**: {view.deadline}  \n**Remaining Lessons**:{remaining}")
+        if view.behind_schedule:
+            st.warning(f"You are behind schedule! {len(view.remaining_lessons)} lessons remain, but only {view.days_left} days left.")
         else:
-            st.success(f"You're on track! {len(remaining_lessons)} lessons left in {days_left} days.")
+            st.success(f"You're on track! {len(view.remaining_lessons)} lessons left in {view.days_left} days.")
     else:
         st.write("No learning goal set yet.")
-    
-    # Show streak count with animation
+
+    # Show streak count
     st.write("### 🔥 Current Learning Streak:")
-    live_streak_counter(progress['streak_count'])
-    
+    live_streak_counter(view.streak_count)
+
     # Show badges
     st.write("### 🏆 Earned Badges:")
-    if progress['badges']:
-        for badge in progress['badges']:
-            st.write(f"- {badge}")
+    if view.badges:
+        st.markdown("\n".join(f"- {badge}" for badge in view.badges))
     else:
         st.write("No badges earned yet. Keep learning!")
 
     # Show quiz scores
     st.write("### 📊 Quiz Scores")
-    for quiz, score in progress["quiz_scores"].items():
-        st.write(f"{quiz}: {score} points")
+    if view.quiz_scores:
+        scores = "  \n".join(f"{quiz}: {score} points" for quiz, score in view.quiz_scores)
+        st.markdown(f"{scores}  \n*Average {view.average_score:.0f}, best {view.best_score}*")
+
+    # Show topic mastery from the precomputed analytics
+    analytics = quiz_analytics()
+    mastery = analytics["mastery"].get(username) if analytics else None
+    if mastery:
+        st.write("### 🎓 Topic Mastery")
+        for topic, value in mastery.items():
+            st.write(f"{topic}: {value:.0%}")
+            st.progress(value)
 
 # Chatbot Section
 elif menu == "💬Chatbot":
@@ -523,8 +602,29 @@ elif menu == "💬Chatbot":
     user_input = st.text_area("Ask your programming-related question here:")
     if st.button("Get Answer"):
         if user_input.strip():
-            response = get_hf_response(user_input)
+            st.session_state.pop("chatbot_response", None)
+            st.session_state["chatbot_job"] = load_job_queue().submit(
+                "chatbot", chatbot_job, user_input, load_answer_cache(), load_lesson_index())
+        else:
+            st.warning("Please enter a valid question!")
+
+    if "chatbot_job" in st.session_state:
+        show_chatbot_job()
+    elif "chatbot_response" in st.session_state:
+        kind, text = st.session_state["chatbot_response"]
+        if kind == "answer":
             st.write("**AI Response:**")
-            st.write(response)
+            st.write(text)
         else:
-            st.warning("Please enter a valid question!")
\ No newline at end of file
+            st.error(text)
+
+# Write this run's progress changes (at most one write per rerun, none if nothing changed)
+with metrics.timer("app_stage_seconds", stage="progress_flush"):
+    progress_session.flush()
+metrics.finish_rerun(rerun)
+
+# Optionally start loading the chatbot model once the first page has rendered
+if os.environ.get("CHATBOT_WARMUP") == "1" and not st.session_state.get("chatbot_warmup_started"):
+    st.session_state["chatbot_warmup_started"] = True
+    from inference_server import warm_up_in_background
+    warm_up_in_background()
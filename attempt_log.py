@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+import metrics
+from content_store import TOPICS
+
+ATTEMPT_LOG_DIR = os.path.join("user_data", "attempts")
+
+# One file per column; row i of every column is attempt i
+COLUMNS = {
+    "timestamp": np.float64,
+    "user": np.uint32,
+    "question": np.uint32,
+    "topic": np.uint8,
+    "correct": np.uint8,
+}
+
+
+class _Dictionary:
+    """Append-only string <-> integer code mapping, one string per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.codes = {}
+        self.values = []
+        self._size = 0
+        self.refresh()
+
+    def refresh(self):
+        """Picks up codes appended by other processes."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == self._size:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self._size)
+            data = f.read()
+        for value in data.splitlines():
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        self._size = os.path.getsize(self.path)
+
+    def code(self, value):
+        """Returns the code of `value`, assigning the next one if it is new (caller holds the lock)."""
+        self.refresh()
+        if value not in self.codes:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(value.replace("\n", " ") + "\n")
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+            self._size = os.path.getsize(self.path)
+        return self.codes[value]
+
+
+class AttemptLog:
+    """
+    Append-only, column-per-file log of every quiz answer.
+    Columns are raw little-endian arrays, so analytics can load millions of
+    attempts with np.fromfile / np.memmap; users and question IDs are
+    dictionary-encoded as integers.
+    """
+
+    def __init__(self, directory=ATTEMPT_LOG_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.users = _Dictionary(os.path.join(directory, "users.txt"))
+        self.questions = _Dictionary(os.path.join(directory, "questions.txt"))
+        self._repair()
+
+    def _path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def _lengths(self):
+        lengths = {}
+        for column, dtype in COLUMNS.items():
+            path = self._path(column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths[column] = size // np.dtype(dtype).itemsize
+        return lengths
+
+    @contextmanager
+    def _exclusive(self):
+        """Holds the log's lock within this process and, where flock exists, across processes."""
+        with self.lock:
+            lock_file = open(os.path.join(self.directory, ".lock"), "w")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+            finally:
+                lock_file.close()
+
+    def _repair(self):
+        """Trims columns to the same row count after a crash mid-append."""
+        # Under the lock, so a column another process is still appending to is not mistaken for a torn write
+        with self._exclusive():
+            lengths = self._lengths()
+            rows = min(lengths.values())
+            for column, dtype in COLUMNS.items():
+                if lengths[column] != rows:
+                    with open(self._path(column), "r+b") as f:
+                        f.truncate(rows * np.dtype(dtype).itemsize)
+
+    def __len__(self):
+        return min(self._lengths().values())
+
+    def append(self, username, attempts):
+        """Records one learner's answers: `attempts` is a list of (question_id, topic, correct)."""
+        if not attempts:
+            return
+        now = time.time()
+        with self._exclusive():
+            user = self.users.code(username)
+            rows = {
+                "timestamp": [now] * len(attempts),
+                "user": [user] * len(attempts),
+                "question": [self.questions.code(qid) for qid, _, _ in attempts],
+                "topic": [TOPICS.index(topic) for _, topic, _ in attempts],
+                "correct": [int(correct) for _, _, correct in attempts],
+            }
+            for column, dtype in COLUMNS.items():
+                data = np.asarray(rows[column], dtype=dtype).tobytes()
+                with open(self._path(column), "ab") as f:
+                    f.write(data)
+                metrics.inc("app_file_bytes_total", len(data), store="attempt_log", op="write")
+
+    def columns(self):
+        """All attempts as a dict of NumPy arrays (memory-mapped, read-only)."""
+        rows = len(self)
+        data = {}
+        for column, dtype in COLUMNS.items():
+            if rows:
+                data[column] = np.memmap(self._path(column), dtype=dtype, mode="r", shape=(rows,))
+            else:
+                data[column] = np.zeros(0, dtype=dtype)
+        self.users.refresh()
+        self.questions.refresh()
+        return data
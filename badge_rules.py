@@ -0,0 +1,70 @@
+from collections import namedtuple
+from datetime import date, datetime
+
+# Events the app fires; every rule subscribes to the ones that can change its outcome
+LESSON_COMPLETED = "lesson_completed"   # data: lesson, all_lessons
+QUIZ_SUBMITTED = "quiz_submitted"       # data: quiz, score, total
+DAY_ROLLED = "day_rolled"               # data: today (first visit on a new day)
+
+# A badge is unlocked the first time `condition(progress, data)` holds after one of `events`
+BadgeRule = namedtuple("BadgeRule", ["badge", "events", "condition"])
+
+BADGE_RULES = [
+    BadgeRule("Lesson Master", (LESSON_COMPLETED,),
+              lambda progress, data: set(data["all_lessons"]) <= set(progress["completed_lessons"])),
+    BadgeRule("Quiz Champ", (QUIZ_SUBMITTED,),
+              lambda progress, data: data["total"] > 0 and data["score"] == data["total"]),
+    BadgeRule("Streak Star", (DAY_ROLLED,),
+              lambda progress, data: progress["streak_count"] >= 7),
+]
+
+
+def advance_streak(progress_session, data):
+    """Streak rule: +1 after a visit on the previous day, otherwise back to 1."""
+    progress = progress_session.progress
+    last_day = date.fromisoformat(progress["last_learning_time"][:10])
+    if (data["today"] - last_day).days == 1:
+        streak_count = progress["streak_count"] + 1
+    else:
+        streak_count = 1
+    progress_session.set_streak(streak_count, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+# Rules that update progress run before the badge rules of the same event
+PROGRESS_RULES = {DAY_ROLLED: [advance_streak]}
+
+
+def day_rolled(progress, today=None):
+    """True on the first visit of a new day (a string compare, no date parsing)."""
+    today = today or date.today()
+    return progress["last_learning_time"][:10] != today.isoformat()
+
+
+class RulesEngine:
+    """
+    Rules indexed by the events they subscribe to. fire() evaluates only the
+    rules of that event, and only for badges the learner doesn't have yet, so
+    nothing runs on a rerun where no event fires. Unlocked badges go through the
+    ProgressSession and are written with the rest of the run's changes in one flush.
+    """
+
+    def __init__(self, badge_rules=BADGE_RULES, progress_rules=PROGRESS_RULES):
+        self.progress_rules = progress_rules
+        self.badge_rules = {}
+        for rule in badge_rules:
+            for event in rule.events:
+                self.badge_rules.setdefault(event, []).append(rule)
+
+    def fire(self, progress_session, event, **data):
+        """Applies one event; returns the badges it unlocked."""
+        for apply in self.progress_rules.get(event, ()):
+            apply(progress_session, data)
+        progress = progress_session.progress
+        earned = set(progress["badges"])
+        unlocked = []
+        for rule in self.badge_rules.get(event, ()):
+            if rule.badge not in earned and rule.condition(progress, data):
+                progress_session.add_badge(rule.badge)
+                earned.add(rule.badge)
+                unlocked.append(rule.badge)
+        return unlocked
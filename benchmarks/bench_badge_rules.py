@@ -0,0 +1,72 @@
+"""
+Shows rule-evaluation cost as badges are added.
+
+Each extra badge subscribes to one of many events (e.g. per-topic quizzes).
+Reports the cost of a rerun where nothing happens, and of firing
+lesson_completed. It compares the rules engine with the old approach of
+checking every badge on every rerun.
+
+Run from the repository root:
+    python -m benchmarks.bench_badge_rules --repeat 2000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from badge_rules import BADGE_RULES, LESSON_COMPLETED, BadgeRule, RulesEngine, day_rolled
+from progress_store import JsonProgressBackend, ProgressSession
+
+RULE_COUNTS = [3, 30, 300, 3000]
+EXTRA_EVENTS = 50
+LESSONS = [f"lesson-{i}" for i in range(5)]
+
+
+def make_rules(count):
+    rules = list(BADGE_RULES)
+    for i in range(count - len(rules)):
+        rules.append(BadgeRule(f"badge-{i}", (f"event-{i % EXTRA_EVENTS}",),
+                               lambda progress, data, i=i: len(progress["quiz_scores"]) > i))
+    return rules
+
+
+def check_all(rules, progress):
+    """The baseline: every badge checked on every rerun, whatever happened."""
+    earned = set(progress["badges"])
+    data = {"all_lessons": LESSONS, "score": 0, "total": 0}
+    return [rule.badge for rule in rules if rule.badge not in earned and rule.condition(progress, data)]
+
+
+def timed(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = ProgressSession(JsonProgressBackend(os.path.join(tmp, "progress")), "bench")
+        progress = session.progress
+        progress["completed_lessons"] = LESSONS[:3]
+
+        print(f"{'rules':>6} {'rerun, engine':>14} {'rerun, check all':>17} {'lesson_completed':>17}")
+        for count in RULE_COUNTS:
+            rules = make_rules(count)
+            engine = RulesEngine(rules)
+            idle = timed(args.repeat, lambda: day_rolled(progress))
+            scan = timed(args.repeat, lambda: check_all(rules, progress))
+            fire = timed(args.repeat, lambda: engine.fire(session, LESSON_COMPLETED, lesson=LESSONS[2],
+                                                          all_lessons=LESSONS))
+            print(f"{count:>6} {idle:>12.2f}us {scan:>15.2f}us {fire:>15.2f}us")
+
+
+if __name__ == "__main__":
+    main()
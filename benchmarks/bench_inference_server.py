@@ -0,0 +1,86 @@
+"""
+Throughput and latency of the chatbot inference worker on CPU.
+
+For each concurrency level, that many simulated users each ask a few
+questions back to back through InferenceClient; the worker batches whatever
+arrives together. Reports requests/s and p50/p95 end-to-end latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_inference_server --concurrency 1 8 32
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from inference_server import InferenceClient
+
+QUESTIONS = [
+    "How do I reverse a list in Python?",
+    "What is the difference between a list and a tuple?",
+    "How do I read a file line by line?",
+    "How do I write a for loop over a dictionary?",
+    "What does the return statement do in a function?",
+    "How do I check if a key exists in a dictionary?",
+    "How do I convert a string to an integer?",
+    "What is a while loop?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_level(client, users, requests_per_user):
+    latencies = []
+    lock = threading.Lock()
+
+    def user(user_id):
+        for i in range(requests_per_user):
+            question = QUESTIONS[(user_id + i) % len(QUESTIONS)]
+            start = time.perf_counter()
+            client.ask(question)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "users": users,
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-user", type=int, default=2)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    client = InferenceClient(max_batch_size=args.max_batch_size).start()
+    client.ready.wait()
+    client.ask(QUESTIONS[0])  # warm-up
+
+    print(f"{'users':>5} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for users in args.concurrency:
+        result = run_level(client, users, args.requests_per_user)
+        print(f"{result['users']:>5} {result['throughput']:>8.2f} {result['p50']:>8.2f} {result['p95']:>8.2f}")
+    totals = client.get_generation_totals()
+    if totals["generated_tokens"]:
+        print(f"tokens generated {totals['generated_tokens']}, kept {totals['kept_tokens']} "
+              f"({1 - totals['kept_tokens'] / totals['generated_tokens']:.0%} wasted)")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
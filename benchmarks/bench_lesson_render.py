@@ -0,0 +1,115 @@
+"""
+Measures Lesson page rerun time: one st.markdown per paragraph (the old page)
+against one cached, pre-rendered HTML fragment per lesson (the current page).
+
+Both variants run as small Streamlit scripts under AppTest over the same
+lessons, so the numbers include Streamlit's per-element cost; the full app's
+Lesson page is timed as well.
+
+Run from the repository root:
+    python -m benchmarks.bench_lesson_render --repeat 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import textwrap
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import streamlit as st
+from content_store import ContentStore
+
+@st.cache_resource
+def store():
+    return ContentStore(quizzes_file=None)
+
+topic = st.session_state["topic"]
+lesson = store().lesson(topic)
+title = topic
+"""
+
+PER_PARAGRAPH = SETUP + """
+from content_store import lesson_paragraphs
+st.markdown("<style>" + open(sys.path[0] + "/app.css").read() + "</style>", unsafe_allow_html=True)
+st.markdown(f"<div class='lesson-card'><h2>{title}</h2>", unsafe_allow_html=True)
+for paragraph in lesson_paragraphs(lesson):
+    st.markdown(f"<p>{paragraph}</p>", unsafe_allow_html=True)
+"""
+
+CACHED = SETUP + """
+from lesson_render import LessonRenderCache
+
+@st.cache_resource
+def renderer():
+    return LessonRenderCache()
+
+@st.cache_resource
+def page_css():
+    return "<style>" + open(sys.path[0] + "/app.css").read() + "</style>"
+
+st.markdown(page_css(), unsafe_allow_html=True)
+st.markdown(renderer().get(lesson, title), unsafe_allow_html=True)
+"""
+
+
+def time_reruns(app, topics, repeat):
+    app.session_state["topic"] = topics[0]
+    app.run()
+    times = []
+    for _ in range(repeat):
+        for topic in topics:
+            app.session_state["topic"] = topic
+            start = time.perf_counter()
+            app.run()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    times.sort()
+    print(f"{name:<16} p50 {statistics.median(times) * 1000:6.1f}ms   "
+          f"p90 {times[int(len(times) * 0.9)] * 1000:6.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from content_store import TOPICS, ContentStore
+    store = ContentStore(quizzes_file=None)
+    topics = [topic for topic in TOPICS if store.lesson(topic) is not None]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, source in [("per paragraph", PER_PARAGRAPH), ("cached HTML", CACHED)]:
+            path = os.path.join(tmp, name.replace(" ", "_") + ".py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(textwrap.dedent(source))
+            app = AppTest.from_file(path, default_timeout=60)
+            report(name, time_reruns(app, topics, args.repeat))
+
+        # The app keeps its progress under the working directory
+        os.chdir(tmp)
+        app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+        app.session_state["logged_in"] = True
+        app.session_state["username"] = "bench_lesson_render"
+        app.run()
+        app.sidebar.radio[0].set_value("📚Lesson")
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            app.run()
+            times.append(time.perf_counter() - start)
+        report("app Lesson page", times)
+        os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
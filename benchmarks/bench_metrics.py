@@ -0,0 +1,87 @@
+"""
+Cost of the metrics hooks, and where app rerun time goes.
+
+First times the hooks themselves (timer() and inc()) with metrics off and on.
+Then reruns each menu page of the full app under AppTest, with metrics off
+and on, and prints the rerun time per page plus the mean time of each
+instrumented stage.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics --repeat 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import timeit
+
+from streamlit.testing.v1 import AppTest
+
+import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MENUS = ["📚Lesson", "💡Quiz", "🔁Review", "⌛Set Learning Goal", "📈Progress", "💬Chatbot"]
+
+
+def hook_overhead(number=200_000):
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        for name, statement in (("timer()", "with metrics.timer('bench_seconds', stage='css'): pass"),
+                                ("inc()", "metrics.inc('bench_bytes_total', 100, store='progress', op='write')")):
+            seconds = timeit.timeit(statement, globals={"metrics": metrics}, number=number)
+            print(f"{'on' if enabled else 'off':>3} {name:<8} {seconds / number * 1e9:6.0f} ns/call")
+
+
+def time_menus(repeat):
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    app.session_state["logged_in"] = True
+    app.session_state["username"] = "bench_metrics"
+    app.run()
+    times = {}
+    for menu in MENUS:
+        app.sidebar.radio[0].set_value(menu)
+        app.run()
+        times[menu] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.run()
+            times[menu].append(time.perf_counter() - start)
+    return {menu: statistics.median(values) for menu, values in times.items()}
+
+
+def histogram_means(name):
+    """label values -> mean of one histogram, from the registry."""
+    with metrics.REGISTRY.lock:
+        return {", ".join(str(value) for _, value in labels): histogram[-2] / histogram[-1]
+                for (histogram_name, labels), histogram in metrics.REGISTRY.histograms.items()
+                if histogram_name == name and histogram[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    hook_overhead()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app keeps its progress under the working directory
+        os.chdir(tmp)
+        metrics.ENABLED = False
+        off = time_menus(args.repeat)
+        metrics.ENABLED = True
+        on = time_menus(args.repeat)
+        os.chdir(ROOT)
+
+    print(f"\n{'page':<22} {'off p50':>9} {'on p50':>9}")
+    for menu in MENUS:
+        print(f"{menu:<22} {off[menu] * 1000:7.1f}ms {on[menu] * 1000:7.1f}ms")
+    print("\nmean stage time (metrics on)")
+    for stage, mean in sorted(histogram_means("app_stage_seconds").items(), key=lambda item: -item[1]):
+        print(f"  {stage:<20} {mean * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Load time, memory and generation speed of the chatbot model per precision.
+
+Each mode is measured in a fresh interpreter, twice: the first run converts
+the hub model and writes a snapshot, the second loads that snapshot.
+
+Run from the repository root:
+    python -m benchmarks.bench_model_loading --modes fp32 bf16 int8
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+QUESTION = "How do I reverse a list in Python?"
+
+
+def run_mode(mode, threads):
+    from inference_server import BatchedGenerator
+    from model_loader import load_model
+
+    start = time.perf_counter()
+    tokenizer, model = load_model(mode=mode, num_threads=threads)
+    load_time = time.perf_counter() - start
+
+    generator = BatchedGenerator(tokenizer, model)
+    tokens = 0
+
+    def count(row, ids):
+        nonlocal tokens
+        tokens += 1
+
+    start = time.perf_counter()
+    generator.generate([QUESTION], on_token=count)
+    generate_time = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "load_s": round(load_time, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "tokens_per_s": round(tokens / generate_time, 2) if generate_time else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", default=["fp32", "bf16", "int8"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.threads)))
+        return
+
+    print(f"{'mode':<6} {'run':<9} {'load (s)':>9} {'max RSS (MB)':>13} {'tokens/s':>9}")
+    for mode in args.modes:
+        for run in ("convert", "snapshot"):
+            command = [sys.executable, "-m", "benchmarks.bench_model_loading", "--child", mode]
+            if args.threads:
+                command += ["--threads", str(args.threads)]
+            lines = subprocess.run(command, capture_output=True, text=True, check=True).stdout.splitlines()
+            result = json.loads(lines[-1])
+            print(f"{mode:<6} {run:<9} {result['load_s']:>9} {result['max_rss_mb']:>13} {result['tokens_per_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
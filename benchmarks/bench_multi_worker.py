@@ -0,0 +1,223 @@
+"""
+Memory and throughput of the multi-worker deployment (see launch.py).
+
+For each front-end count, that many front-end processes are started. Each
+opens the app's shared read-only content (quiz bank, search index, rendered
+lessons) and then has --users simulated users ask chatbot questions. Two
+modes are compared:
+  own     every front-end starts its own inference worker (one model copy each)
+  shared  every front-end talks to one model server over a Unix socket
+Reported per run: mean RSS of a front-end process tree (the front-end plus
+its inference worker, if any), model server RSS, total PSS (shared pages
+split between the processes that map them) and aggregate answers/s.
+
+The front-ends here are small stand-ins that load what app.py loads, not
+Streamlit servers, so the numbers isolate the model and content sharing.
+
+Run from the repository root:
+    python -m benchmarks.bench_multi_worker --frontends 1 2 4 8
+Without the model download (random weights, byte-level tokenizer):
+    python -m benchmarks.bench_multi_worker --loader benchmarks.bench_multi_worker:random_codegen
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.bench_inference_server import QUESTIONS
+
+# Size of the random-weight stand-in model (codegen-350M is 20 layers of 1024)
+RANDOM_LAYERS = 6
+RANDOM_WIDTH = 512
+
+
+class ByteTokenizer:
+    """UTF-8 bytes as token IDs, with 256 as end-of-text."""
+
+    eos_token_id = 256
+    pad_token_id = None
+
+    def __call__(self, text, return_tensors=None):
+        import torch
+
+        ids = list(text.encode("utf-8"))
+        return {"input_ids": torch.tensor([ids]) if return_tensors == "pt" else ids}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return bytes(int(i) for i in ids if int(i) < 256).decode("utf-8", errors="ignore")
+
+
+def random_codegen():
+    """A CodeGen model with random weights, for measuring without the model download."""
+    import torch
+    from transformers import CodeGenConfig, CodeGenForCausalLM
+
+    torch.manual_seed(0)
+    config = CodeGenConfig(n_layer=RANDOM_LAYERS, n_embd=RANDOM_WIDTH, n_head=8, rotary_dim=32, vocab_size=257,
+                           n_positions=2048, bos_token_id=256, eos_token_id=256)
+    return ByteTokenizer(), CodeGenForCausalLM(config)
+
+
+def memory_kb(pid):
+    """(RSS, PSS) in kB of a process and all its descendants, from /proc."""
+    rss = pss = 0
+    pids = [pid]
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                rss += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                pss += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, StopIteration):
+            continue
+    return rss, pss
+
+
+def frontend(args):
+    """One front-end process: open the shared content, connect to a model, then answer on "go"."""
+    from lesson_render import MappedLessonCache
+    from model_server import RemoteInferenceClient, resolve_loader
+    from quiz_bank import QuizBank, ensure_quiz_bank
+    from search_index import SearchIndex, ensure_search_index
+    from content_store import TOPICS, ContentStore
+    from inference_server import InferenceClient
+    from master_store import item_title
+
+    store = ContentStore(quizzes_file=None)
+    quiz_bank = QuizBank(ensure_quiz_bank())
+    search_index = SearchIndex(ensure_search_index())
+    lessons = MappedLessonCache(args.lesson_cache)
+    if args.mode == "shared":
+        client = RemoteInferenceClient(args.address).start()
+    else:
+        client = InferenceClient(resolve_loader(args.loader)).start()
+    client.ready.wait()
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    def user(user_id):
+        for i in range(args.requests):
+            # Touch the shared content the way a session would between questions
+            search_index.search(QUESTIONS[(user_id + i) % len(QUESTIONS)], k=5)
+            quiz_bank.question_pool(TOPICS[(user_id + i) % len(TOPICS)])[0]
+            for items in store.lessons_by_topic.values():
+                if items:
+                    lessons.get(items[-1], item_title(items[-1]))
+            client.ask(QUESTIONS[(user_id + i) % len(QUESTIONS)])
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps({"answers": args.users * args.requests, "seconds": time.perf_counter() - start}), flush=True)
+    sys.stdin.readline()  # Stay alive until the parent has measured memory
+    client.close()
+
+
+def read_message(process):
+    """Next line the front-end wrote for us (inference workers print to the same stdout)."""
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("front-end exited early")
+        if line.startswith(("ready", "{")):
+            return line.strip()
+
+
+def run(mode, count, args, env):
+    server = None
+    if mode == "shared":
+        if os.path.exists(args.address):
+            os.remove(args.address)
+        server = subprocess.Popen([sys.executable, "-m", "model_server", "--address", args.address,
+                                   "--loader", args.loader], env=env, stdout=subprocess.DEVNULL)
+        while not os.path.exists(args.address):
+            if server.poll() is not None:
+                raise RuntimeError("model server failed to start")
+            time.sleep(0.2)
+    command = [sys.executable, "-m", "benchmarks.bench_multi_worker", "--frontend", "--mode", mode,
+               "--loader", args.loader, "--address", args.address, "--users", str(args.users),
+               "--requests", str(args.requests), "--lesson-cache", args.lesson_cache]
+    frontends = [subprocess.Popen(command, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(count)]
+    try:
+        for process in frontends:
+            read_message(process)
+        start = time.perf_counter()
+        for process in frontends:
+            process.stdin.write("go\n")
+            process.stdin.flush()
+        results = [json.loads(read_message(process)) for process in frontends]
+        elapsed = time.perf_counter() - start
+
+        frontend_memory = [memory_kb(process.pid) for process in frontends]
+        server_memory = memory_kb(server.pid) if server is not None else (0, 0)
+        answers = sum(result["answers"] for result in results)
+        rss = sum(memory for memory, _ in frontend_memory) / count / 1024
+        total_pss = (sum(pss for _, pss in frontend_memory) + server_memory[1]) / 1024
+        print(f"{mode:>6} {count:>9} {rss:>16.0f} {server_memory[0] / 1024:>14.0f} {total_pss:>14.0f} "
+              f"{answers / elapsed:>10.2f}")
+    finally:
+        for process in frontends:
+            if process.poll() is None:
+                try:
+                    process.stdin.write("exit\n")
+                    process.stdin.flush()
+                except BrokenPipeError:
+                    pass
+        for process in frontends:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frontends", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", default=["own", "shared"], choices=["own", "shared"])
+    parser.add_argument("--loader", default="model_loader:load_model", help="module:function returning (tokenizer, model)")
+    parser.add_argument("--users", type=int, default=2, help="simulated users per front-end")
+    parser.add_argument("--requests", type=int, default=2, help="questions per user")
+    parser.add_argument("--address", default=os.path.join("/tmp", f"bench-multi-worker-{os.getpid()}.sock"))
+    parser.add_argument("--lesson-cache", help=argparse.SUPPRESS)
+    parser.add_argument("--frontend", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="shared", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.frontend:
+        frontend(args)
+        return
+
+    # Build the shared files once, so front-ends only map them; the lesson cache
+    # goes to a scratch file, since the app's is built for its lesson menu
+    from lesson_render import build_lesson_cache
+    from quiz_bank import ensure_quiz_bank
+    from search_index import ensure_search_index
+    ensure_quiz_bank()
+    ensure_search_index()
+    args.lesson_cache = build_lesson_cache(out_file=os.path.join("/tmp", f"bench-multi-worker-{os.getpid()}.bin"))
+
+    env = dict(os.environ, INFERENCE_SERVER_AUTHKEY=os.urandom(16).hex())
+    print(f"{'mode':>6} {'frontends':>9} {'RSS/front (MB)':>16} {'server (MB)':>14} {'total PSS (MB)':>14} "
+          f"{'answers/s':>10}")
+    try:
+        for mode in args.modes:
+            for count in args.frontends:
+                run(mode, count, args, env)
+    finally:
+        os.remove(args.lesson_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Times the attempt analytics on a synthetic attempt log.
+
+Learners and questions get random abilities and difficulties, attempts are
+drawn from a logistic model and written straight into the column files, then
+quiz_analytics builds its full report. The recovered difficulty is checked
+against the true one.
+
+Run from the repository root:
+    python -m benchmarks.bench_quiz_analytics --attempts 5000000 --users 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from attempt_log import COLUMNS, AttemptLog
+from content_store import TOPICS
+from quiz_analytics import build_report
+
+
+def write_synthetic_log(directory, attempts, users, questions, seed=0):
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(0.5, 1.0, users)
+    difficulty = rng.normal(0.0, 1.0, questions)
+    user = rng.integers(0, users, attempts).astype(np.uint32)
+    question = rng.integers(0, questions, attempts).astype(np.uint32)
+    probability = 1.0 / (1.0 + np.exp(difficulty[question] - ability[user]))
+    columns = {
+        "timestamp": np.full(attempts, time.time()),
+        "user": user,
+        "question": question,
+        "topic": (question % len(TOPICS)).astype(np.uint8),
+        "correct": (rng.random(attempts) < probability).astype(np.uint8),
+    }
+    for column, dtype in COLUMNS.items():
+        columns[column].astype(dtype).tofile(os.path.join(directory, f"{column}.bin"))
+    with open(os.path.join(directory, "users.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"user-{u}\n" for u in range(users))
+    with open(os.path.join(directory, "questions.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"q{q:011d}\n" for q in range(questions))
+    return difficulty
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--questions", type=int, default=3400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        true_difficulty = write_synthetic_log(directory, args.attempts, args.users, args.questions)
+        print(f"wrote {args.attempts} attempts in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        report = build_report(AttemptLog(directory))
+        elapsed = time.perf_counter() - start
+        print(f"analysed {report['attempts']} attempts in {elapsed:.2f}s "
+              f"(vectorized part {report['compute_seconds']:.2f}s)")
+
+        estimated = np.array([report["questions"][f"q{q:011d}"]["difficulty"] for q in range(args.questions)])
+        discrimination = np.array([stats["discrimination"] for stats in report["questions"].values()])
+        print(f"difficulty correlation with truth: {np.corrcoef(estimated, true_difficulty)[0, 1]:.3f}")
+        print(f"mean discrimination: {discrimination.mean():.3f}, learners with mastery: {len(report['mastery'])}")
+
+
+if __name__ == "__main__":
+    main()
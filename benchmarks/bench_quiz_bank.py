@@ -0,0 +1,68 @@
+"""
+Compares the JSON quiz path with the memory-mapped quiz bank.
+
+Each mode runs in a fresh interpreter and reports resident memory (anonymous
+vs file-backed, i.e. shareable) and the time until the first question of the
+first topic is available.
+
+Run from the repository root:
+    python -m benchmarks.bench_quiz_bank
+"""
+import json
+import subprocess
+import sys
+import time
+
+
+def rss_kb():
+    """Returns (anonymous, file-backed) resident set size in kB from /proc."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.strip()
+    parse = lambda key: int(fields.get(key, "0 kB").split()[0])
+    return parse("RssAnon"), parse("RssFile")
+
+
+def run_mode(mode):
+    anon_before, file_before = rss_kb()
+    start = time.perf_counter()
+    if mode == "json":
+        from content_store import TOPICS, ContentStore
+        source = ContentStore(lessons_file=None)
+    else:
+        from content_store import TOPICS
+        from quiz_bank import QuizBank, ensure_quiz_bank
+        source = QuizBank(ensure_quiz_bank())
+    question = source.question_pool(TOPICS[0])[0]
+    elapsed = time.perf_counter() - start
+    anon_after, file_after = rss_kb()
+    return {
+        "mode": mode,
+        "first_question_ms": round(elapsed * 1000, 2),
+        "rss_anon_kb": anon_after - anon_before,
+        "rss_file_kb": file_after - file_before,
+        "question": question["id"]
+    }
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        print(json.dumps(run_mode(sys.argv[2])))
+        return
+
+    # Compile once up front so the mmap run measures the reader, not the compiler
+    from quiz_bank import ensure_quiz_bank
+    ensure_quiz_bank()
+
+    print(f"{'mode':<6} {'first question (ms)':>20} {'RSS anon (kB)':>14} {'RSS file (kB)':>14}")
+    for mode in ("json", "mmap"):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_quiz_bank", "--mode", mode],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        print(f"{mode:<6} {result['first_question_ms']:>20} {result['rss_anon_kb']:>14} {result['rss_file_kb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmarks the spaced-repetition index at 100k learners x 3,000 questions.
+
+Most learners get a few dozen cards; a set of heavy learners has a card for
+every question. Reports index build time, "what's due now" latency from the
+heap vs. scanning every card, and the cost of rescheduling after an answer.
+
+Run from the repository root:
+    python -m benchmarks.bench_review_scheduler --users 100000 --questions 3000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from review_scheduler import DAY, ReviewIndex
+
+DUE_LIMIT = 5
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def scan_due(cards, now, limit):
+    """The baseline: look at every card and sort the due ones."""
+    return [qid for due, qid in sorted((card.due, qid) for qid, card in cards.items() if card.due <= now)][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--cards-per-user", type=int, default=30)
+    parser.add_argument("--heavy-users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = time.time()
+    question_ids = [f"q{q:011d}" for q in range(args.questions)]
+
+    def stored_cards(n):
+        return {qid: [2.5, 1.0, 1, now + rng.uniform(-3, 30) * DAY] for qid in rng.sample(question_ids, n)}
+
+    index = ReviewIndex()
+    start = time.perf_counter()
+    for u in range(args.users):
+        n = args.questions if u < args.heavy_users else args.cards_per_user
+        index.queue(f"user-{u}", stored_cards(n))
+    build = time.perf_counter() - start
+    total_cards = sum(len(queue) for queue in index.queues.values())
+    print(f"indexed {total_cards} cards for {args.users} users in {build:.1f}s")
+
+    for label, users in (("typical", range(args.heavy_users, args.users)), ("heavy", range(args.heavy_users))):
+        users = list(users)
+        heap_times, scan_times = [], []
+        for _ in range(args.queries):
+            username = f"user-{rng.choice(users)}"
+            t = time.perf_counter()
+            due = index.due(username, now, DUE_LIMIT)
+            heap_times.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            expected = scan_due(index.queues[username].cards, now, DUE_LIMIT)
+            scan_times.append(time.perf_counter() - t)
+            assert [index.queues[username].cards[qid].due for qid in due] == \
+                   [index.queues[username].cards[qid].due for qid in expected]
+        print(f"due now ({label} users): heap p50 {statistics.median(heap_times) * 1e6:.1f}us "
+              f"p99 {percentile(heap_times, 0.99) * 1e6:.1f}us | "
+              f"scan p50 {statistics.median(scan_times) * 1e6:.1f}us p99 {percentile(scan_times, 0.99) * 1e6:.1f}us")
+
+    times = []
+    for _ in range(args.queries):
+        username = f"user-{rng.randrange(args.users)}"
+        qid = rng.choice(question_ids)
+        t = time.perf_counter()
+        index.record(username, qid, rng.random() < 0.7, now)
+        times.append(time.perf_counter() - t)
+    print(f"reschedule after answer: p50 {statistics.median(times) * 1e6:.1f}us "
+          f"p99 {percentile(times, 0.99) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
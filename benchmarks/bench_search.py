@@ -0,0 +1,49 @@
+"""
+Measures search latency on the full lesson + quiz bank.
+
+Builds the index if needed, opens it through mmap and runs a fixed set of
+queries (exact words, prefixes as typed, typos, multi-word) many times.
+
+Run from the repository root:
+    python -m benchmarks.bench_search --repeat 200
+"""
+import argparse
+import statistics
+import time
+
+from search_index import SearchIndex, ensure_search_index
+
+QUERIES = [
+    "for loop", "while", "dictionary keys", "list comprehension", "recursion base case",
+    "lamb", "func", "vari", "tupl",
+    "fucntion", "dictionray", "varaible scope", "exeption handling",
+    "difference between list and tuple", "how do default arguments work in a function",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SearchIndex(ensure_search_index())
+    print(f"opened index ({index.n_docs} documents, {len(index.terms)} terms) in "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+    times = []
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            t = time.perf_counter()
+            index.search(query)
+            times.append(time.perf_counter() - t)
+    times.sort()
+    print(f"{len(times)} queries: p50 {statistics.median(times) * 1000:.2f}ms, "
+          f"p99 {times[int(len(times) * 0.99)] * 1000:.2f}ms, max {times[-1] * 1000:.2f}ms")
+    for query in QUERIES[9:13]:
+        top = index.search(query, k=1)
+        print(f"  {query!r} -> {top[0]['title'] if top else None!r}")
+
+
+if __name__ == "__main__":
+    main()
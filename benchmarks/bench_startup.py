@@ -0,0 +1,84 @@
+"""
+Time-to-first-render of app.py for each menu entry, with import-time breakdowns.
+
+Every menu entry is rendered in a fresh interpreter started with
+`python -X importtime`, using Streamlit's AppTest harness with a logged-in
+session. The report shows the render time and the slowest top-level imports.
+
+To compare before/after a change, point --app at another checkout:
+    git worktree add /tmp/app-before <commit>
+    python -m benchmarks.bench_startup --app /tmp/app-before/app.py
+    python -m benchmarks.bench_startup --app app.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+MENUS = ["📚Lesson", "💡Quiz", "⌛Set Learning Goal", "📈Progress", "💬Chatbot"]
+
+# Imported by the interpreter or this harness, not by app.py
+HARNESS_IMPORTS = ("site", "streamlit.testing")
+
+
+def render(app_path, menu):
+    """Child process: renders `menu` once and returns the elapsed wall time."""
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    app = AppTest.from_file(app_path, default_timeout=600)
+    app.session_state["logged_in"] = True
+    app.session_state["username"] = "bench-user"
+    app.run()
+    if menu != MENUS[0]:
+        app.sidebar.radio[0].set_value(menu)
+        app.run()
+    return time.perf_counter() - start
+
+
+def top_imports(importtime_log, limit):
+    """Parses `-X importtime` output into the slowest top-level imports (cumulative ms)."""
+    totals = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name.startswith("  "):
+            continue  # Only top-level imports, not their dependencies
+        if name.strip().startswith(HARNESS_IMPORTS):
+            continue
+        totals.append((int(cumulative) / 1000, name.strip()))
+    return sorted(totals, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--top", type=int, default=5, help="imports to list per menu")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+
+    if args.child:
+        sys.path.insert(0, os.path.dirname(app_path))
+        print(json.dumps({"seconds": render(app_path, args.child)}))
+        return
+
+    for menu in MENUS:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--app", app_path, "--child", menu],
+            capture_output=True, text=True, cwd=os.path.dirname(app_path)
+        )
+        if result.returncode != 0:
+            print(f"{menu}: failed\n{result.stderr[-2000:]}")
+            continue
+        seconds = json.loads(result.stdout.splitlines()[-1])["seconds"]
+        print(f"{menu}: first render {seconds:.2f}s")
+        for ms, name in top_imports(result.stderr, args.top):
+            print(f"    {ms:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
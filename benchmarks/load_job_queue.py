@@ -0,0 +1,118 @@
+"""
+Load test: do chatbot requests tie up the server's script threads?
+
+Script runs execute on a fixed pool of "server threads". Many sessions ask
+the chatbot at once, while other sessions keep clicking through quick pages.
+Two modes are compared:
+  blocking  the script run streams the whole answer itself (the old Chatbot page)
+  queued    the script run submits a job and returns; polling runs
+            (every --poll seconds) only read the job status
+For each mode the test reports how long a quick page rerun waits for a free
+thread, plus how many threads were busy on average.
+
+Run from the repository root:
+    python -m benchmarks.load_job_queue --sessions 32 --server-threads 8
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from job_queue import DONE, FAILED, JobQueue
+
+QUICK_PAGE_SECONDS = 0.005
+
+
+class BusyTime:
+    """Total seconds server threads spent running scripts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = 0.0
+        self.local = threading.local()
+
+    def __enter__(self):
+        self.local.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.seconds += time.perf_counter() - self.local.start
+
+
+def fake_generation(report, tokens, token_seconds):
+    """Stands in for streaming an answer from the inference worker."""
+    text = ""
+    for i in range(tokens):
+        time.sleep(token_seconds)
+        text += f"t{i} "
+        report(partial=text)
+    return text
+
+
+def run(mode, args):
+    server = ThreadPoolExecutor(max_workers=args.server_threads)
+    jobs = JobQueue()
+    busy = BusyTime()
+
+    def script_run(work):
+        with busy:
+            return work()
+
+    def chatbot_session():
+        if mode == "blocking":
+            server.submit(script_run, lambda: fake_generation(lambda **_: None, args.tokens,
+                                                              args.token_seconds)).result()
+            return
+        job_id = server.submit(script_run, lambda: jobs.submit("chatbot", fake_generation, args.tokens,
+                                                                 args.token_seconds)).result()
+        while True:
+            time.sleep(args.poll)
+            job = server.submit(script_run, lambda: jobs.status(job_id)).result()
+            if job["status"] in (DONE, FAILED):
+                return
+
+    waits = []
+
+    def quick_session(stop):
+        while not stop.is_set():
+            queued = time.perf_counter()
+            started = server.submit(script_run, lambda: (time.perf_counter(), time.sleep(QUICK_PAGE_SECONDS))[0])
+            waits.append(started.result() - queued)
+            time.sleep(0.05)
+
+    stop = threading.Event()
+    start = time.perf_counter()
+    quick = [threading.Thread(target=quick_session, args=(stop,)) for _ in range(args.quick_sessions)]
+    chat = [threading.Thread(target=chatbot_session) for _ in range(args.sessions)]
+    for thread in quick + chat:
+        thread.start()
+    for thread in chat:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in quick:
+        thread.join()
+    server.shutdown()
+
+    waits.sort()
+    print(f"{mode:>8}: {args.sessions} answers in {elapsed:.1f}s, on average {busy.seconds / elapsed:.2f}/"
+          f"{args.server_threads} server threads busy, quick page wait p50 {statistics.median(waits) * 1000:.1f}ms "
+          f"p99 {waits[int(len(waits) * 0.99)] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=32, help="sessions asking the chatbot at once")
+    parser.add_argument("--quick-sessions", type=int, default=8, help="sessions clicking through quick pages")
+    parser.add_argument("--server-threads", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--token-seconds", type=float, default=0.02)
+    parser.add_argument("--poll", type=float, default=0.5)
+    args = parser.parse_args()
+    for mode in ("blocking", "queued"):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Load test for the progress backends.
+
+Simulates many concurrent sessions: every user is driven by several threads at
+once (like one learner with multiple browser tabs), each completing lessons,
+submitting quiz scores and earning badges. Afterwards every user's record is
+checked for lost updates.
+
+Run from the repository root:
+    python -m benchmarks.load_progress_store --users 200 --sessions 4 --backend sqlite
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from progress_store import JsonProgressBackend, SqliteProgressBackend
+
+LESSONS_PER_SESSION = 5
+QUIZZES_PER_SESSION = 5
+
+
+def simulate_session(backend, username, session, errors):
+    try:
+        backend.load(username)
+        for i in range(LESSONS_PER_SESSION):
+            backend.add_completed_lesson(username, f"lesson-{session}-{i}")
+        for i in range(QUIZZES_PER_SESSION):
+            backend.set_quiz_score(username, f"quiz-{session}-{i}", i)
+        backend.add_badge(username, f"badge-{session}")
+        backend.set_streak(username, session + 1, "2026-01-01 00:00:00")
+    except Exception as e:
+        errors.append(e)
+
+
+def run(backend, users, sessions):
+    errors = []
+    threads = [
+        threading.Thread(target=simulate_session, args=(backend, f"user-{u}", s, errors))
+        for u in range(users) for s in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    lost = 0
+    for u in range(users):
+        progress = backend.load(f"user-{u}")
+        lost += sessions * LESSONS_PER_SESSION - len(progress["completed_lessons"])
+        lost += sessions * QUIZZES_PER_SESSION - len(progress["quiz_scores"])
+        lost += sessions - len(progress["badges"])
+
+    operations = users * sessions * (LESSONS_PER_SESSION + QUIZZES_PER_SESSION + 3)
+    print(f"{len(threads)} concurrent sessions, {operations} operations in {elapsed:.2f}s "
+          f"({operations / elapsed:.0f} ops/s)")
+    print(f"errors: {len(errors)}, lost updates: {lost}")
+    return lost == 0 and not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions per user")
+    parser.add_argument("--backend", choices=["sqlite", "json"], default="sqlite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            backend = SqliteProgressBackend(os.path.join(tmp, "progress.db"))
+        else:
+            backend = JsonProgressBackend(os.path.join(tmp, "progress"))
+        ok = run(backend, args.users, args.sessions)
+        if args.backend == "sqlite":
+            backend.close()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+
+from master_store import read_master
+
+# Master files written by gemini.py (JSON Lines, see master_store)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_LESSONS_FILE = os.path.join(BASE_DIR, "all_lessons.jsonl")
+MASTER_QUIZZES_FILE = os.path.join(BASE_DIR, "all_quizzes.jsonl")
+
+# Canonical topics (same list gemini.py generates content for)
+TOPICS = [
+    "Introduction to Python",
+    "Variables and Data Types",
+    "Conditionals",
+    "Loops",
+    "Functions"
+]
+
+# Keywords used to map free-form generated titles onto a canonical topic
+TOPIC_KEYWORDS = {
+    "Introduction to Python": ("introduction to python", "intro"),
+    "Variables and Data Types": ("variable", "data type"),
+    "Conditionals": ("conditional",),
+    "Loops": ("loop",),
+    "Functions": ("function",)
+}
+
+# Lesson fields rendered as paragraphs, in display order
+LESSON_FIELDS = [
+    "overview", "description", "lessonDescription", "objective",
+    "learning_objectives", "learningObjectives", "content", "sections",
+    "modules", "key_concepts", "example_code", "exampleCode", "explanation",
+    "exercises", "summary"
+]
+
+
+def normalize_text(text):
+    """Lower-cases and collapses whitespace so trivially different strings compare equal."""
+    return " ".join(str(text).lower().split())
+
+
+def topic_for_title(title):
+    """Maps a lesson/quiz title (e.g. "Loops in Programming", "Loops Quiz") to a canonical topic."""
+    if not title:
+        return None
+    normalized = normalize_text(title)
+    for topic in TOPICS:
+        if normalize_text(topic) in normalized:
+            return topic
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        if any(keyword in normalized for keyword in keywords):
+            return topic
+    return None
+
+
+def question_id(question, options):
+    """Stable ID from the normalized question text plus its options."""
+    key = normalize_text(question) + "\x1f" + "\x1f".join(normalize_text(o) for o in options)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def lesson_id(lesson):
+    """Stable ID from the lesson's content, so references survive rebuilt master files."""
+    return hashlib.sha1(json.dumps(lesson, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_question(raw):
+    """
+    Returns a question dict with the keys the app expects ("question", "options", "answer").
+    Older generations use "correct_answer" instead of "answer".
+    Returns None for items that can't be rendered.
+    """
+    question = raw.get("question")
+    options = raw.get("options")
+    answer = raw.get("answer", raw.get("correct_answer"))
+    if not question or not isinstance(options, list) or not options or answer is None:
+        return None
+    options = [str(option) for option in options]
+    return {
+        "id": question_id(question, options),
+        "question": str(question),
+        "options": options,
+        "answer": str(answer)
+    }
+
+
+def _flatten(value):
+    """Turns nested lesson fields (strings, lists, dicts) into a flat list of paragraphs."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, (int, float)):
+        return [str(value)]
+    if isinstance(value, list):
+        paragraphs = []
+        for item in value:
+            paragraphs.extend(_flatten(item))
+        return paragraphs
+    if isinstance(value, dict):
+        paragraphs = []
+        heading = value.get("title") or value.get("heading") or value.get("sectionTitle") or value.get("concept")
+        if heading:
+            paragraphs.append(f"**{heading}**")
+        for key, item in value.items():
+            if key in ("title", "heading", "sectionTitle", "concept"):
+                continue
+            paragraphs.extend(_flatten(item))
+        return paragraphs
+    return []
+
+
+def lesson_paragraphs(lesson):
+    """Flattens any of the generated lesson layouts into paragraphs for display."""
+    paragraphs = []
+    for field in LESSON_FIELDS:
+        paragraphs.extend(_flatten(lesson.get(field)))
+    return paragraphs
+
+
+class ContentStore:
+    """
+    In-memory index over the lesson and quiz master files.
+    Both files are parsed once; afterwards every lookup is a dict access.
+    Pass quizzes_file=None to index lessons only (e.g. when quizzes are served from quiz_bank).
+    """
+
+    def __init__(self, lessons_file=MASTER_LESSONS_FILE, quizzes_file=MASTER_QUIZZES_FILE):
+        self.lessons_by_topic = {topic: [] for topic in TOPICS}
+        self.lessons_by_id = {}
+        self.pools_by_topic = {topic: [] for topic in TOPICS}
+        self.questions_by_id = {}
+        self.duplicates_dropped = 0
+        self.invalid_dropped = 0
+
+        if lessons_file:
+            self._ingest_lessons(read_master(lessons_file))
+        if quizzes_file:
+            self._ingest_quizzes(read_master(quizzes_file))
+
+    def _ingest_lessons(self, lessons):
+        for lesson in lessons:
+            topic = topic_for_title(lesson.get("title") or lesson.get("lessonTitle"))
+            if topic:
+                self.lessons_by_topic[topic].append(lesson)
+                self.lessons_by_id[lesson_id(lesson)] = lesson
+
+    def _ingest_quizzes(self, quizzes):
+        for quiz in quizzes:
+            topic = topic_for_title(quiz.get("title"))
+            if not topic:
+                continue
+            for raw in quiz.get("questions", []):
+                question = normalize_question(raw)
+                if question is None:
+                    self.invalid_dropped += 1
+                elif question["id"] in self.questions_by_id:
+                    self.duplicates_dropped += 1
+                else:
+                    self.questions_by_id[question["id"]] = question
+                    self.pools_by_topic[topic].append(question)
+
+    def lesson(self, topic):
+        """Most recently generated lesson for a topic, or None."""
+        lessons = self.lessons_by_topic.get(topic)
+        return lessons[-1] if lessons else None
+
+    def lesson_by_id(self, lid):
+        return self.lessons_by_id.get(lid)
+
+    def question_pool(self, topic):
+        """All unique questions for a topic, in first-seen order."""
+        return self.pools_by_topic.get(topic, [])
+
+    def question(self, qid):
+        return self.questions_by_id.get(qid)
+
+    def stats(self):
+        return {
+            "lessons": sum(len(v) for v in self.lessons_by_topic.values()),
+            "questions": len(self.questions_by_id),
+            "duplicates_dropped": self.duplicates_dropped,
+            "invalid_dropped": self.invalid_dropped
+        }
@@ -0,0 +1,145 @@
+# Token budgets for one chatbot answer
+MAX_NEW_TOKENS = 160
+MAX_QUESTION_TOKENS = 64
+MAX_CONTEXT_TOKENS = 192
+
+# The few-shot prompt teaches the model a "Q:/A:" pattern; a new "Q:" means the answer is over
+STOP_SEQUENCES = ("\nQ:", "\nQuestion:")
+
+# A run of this many tokens seen before means the model is looping
+REPEAT_NGRAM = 12
+
+
+def truncate_tokens(tokenizer, text, max_tokens):
+    """Returns (text cut to at most max_tokens tokens, whether it was cut)."""
+    ids = tokenizer(text)["input_ids"]
+    if len(ids) <= max_tokens:
+        return text, False
+    return tokenizer.decode(ids[:max_tokens], skip_special_tokens=True), True
+
+
+def _contains_run(ids, n):
+    """True if the last n ids also occur earlier in the sequence."""
+    if len(ids) < 2 * n:
+        return False
+    tail = ids[-n:]
+    first = tail[0]
+    for i in range(len(ids) - n):
+        if ids[i] == first and ids[i:i + n] == tail:
+            return True
+    return False
+
+
+class GenerationController:
+    """
+    Decides, token by token, when one answer is finished: end of text, the
+    max_new_tokens budget, a stop sequence, or the model repeating itself
+    (a line it already wrote, or a run of REPEAT_NGRAM tokens).
+    text() is the answer cut at the stopping point; visible() is the part that
+    is safe to stream (nothing that may still turn out to be a stop sequence or a repeat).
+    """
+
+    def __init__(self, tokenizer, max_new_tokens=MAX_NEW_TOKENS, stop_sequences=STOP_SEQUENCES,
+                 repeat_ngram=REPEAT_NGRAM):
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.stop_sequences = stop_sequences
+        self.repeat_ngram = repeat_ngram
+        self.ids = []
+        self.decoded = ""
+        self.cut = None
+        self.stop_reason = None
+        self.seen_lines = set()
+        self.checked_upto = 0
+
+    @property
+    def finished(self):
+        return self.stop_reason is not None
+
+    def _stop(self, reason, cut):
+        self.stop_reason = reason
+        self.cut = cut
+
+    def add(self, token_id, is_eos):
+        """Feeds one generated token; returns True once the answer is finished."""
+        if self.finished:
+            return True
+        if is_eos:
+            self._stop("eos", len(self.decoded))
+            return True
+        self.ids.append(token_id)
+        self.decoded = self.tokenizer.decode(self.ids, skip_special_tokens=True)
+
+        for stop in self.stop_sequences:
+            position = self.decoded.find(stop)
+            if position != -1 and (self.cut is None or position < self.cut):
+                self._stop("stop_sequence", position)
+        if self.finished:
+            return True
+
+        # Check each line as it completes
+        while True:
+            newline = self.decoded.find("\n", self.checked_upto)
+            if newline == -1:
+                break
+            line = self.decoded[self.checked_upto:newline].strip()
+            if line and line in self.seen_lines:
+                self._stop("repetition", self.checked_upto)
+                return True
+            if line:
+                self.seen_lines.add(line)
+            self.checked_upto = newline + 1
+
+        # A looping run inside a line has already been streamed, so it is kept as is
+        if _contains_run(self.ids, self.repeat_ngram):
+            self._stop("repetition", len(self.decoded))
+            return True
+
+        if len(self.ids) >= self.max_new_tokens:
+            self._stop("max_new_tokens", len(self.decoded))
+            return True
+        return False
+
+    def text(self):
+        end = self.cut if self.cut is not None else len(self.decoded)
+        return self.decoded[:end].rstrip()
+
+    def visible(self):
+        if self.finished:
+            return self.text()
+        text = self.decoded
+        end = len(text)
+        if text.endswith("\ufffd"):
+            end -= 1  # A multi-byte character is still being generated
+        # Hold back a tail that could be the start of a stop sequence
+        holdback = 0
+        for stop in self.stop_sequences:
+            for k in range(len(stop) - 1, holdback, -1):
+                if text[:end].endswith(stop[:k]):
+                    holdback = k
+                    break
+        end -= holdback
+        # Hold back a partial line that may turn out to repeat an earlier one
+        partial = text[self.checked_upto:end].strip()
+        if partial and any(line.startswith(partial) for line in self.seen_lines):
+            end = self.checked_upto
+        return text[:end]
+
+    def _tokens_before(self, position):
+        """Fewest generated tokens whose text reaches `position` (binary search over decodes)."""
+        low, high = 0, len(self.ids)
+        while low < high:
+            middle = (low + high) // 2
+            if len(self.tokenizer.decode(self.ids[:middle], skip_special_tokens=True)) >= position:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def stats(self):
+        """Tokens generated vs. tokens that made it into the answer."""
+        return {
+            "generated_tokens": len(self.ids) + (self.stop_reason == "eos"),
+            "kept_tokens": self._tokens_before(len(self.text())),
+            "stop_reason": self.stop_reason
+        }
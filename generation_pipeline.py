@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from types import SimpleNamespace
+
+from master_store import MasterFile
+from stream_ingest import ingest_quiz_stream
+
+# One unit of work: generate one content type ("lesson" or "quiz") for one topic
+Job = namedtuple("Job", ["kind", "topic"])
+
+# Defaults for the generation run
+MAX_WORKERS = 4
+REQUESTS_PER_MINUTE = 10
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0
+
+
+def job_key(job):
+    return f"{job.kind}:{job.topic}"
+
+
+def extract_json(response_text):
+    """Returns the JSON enclosed in ```json fences, or the whole text if there is none."""
+    match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    return response_text.strip()
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / requests_per_minute seconds apart, across threads."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """Append-only log of completed jobs, so an interrupted run can resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = set()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.completed.add(json.loads(line)["job"])
+
+    def done(self, job):
+        return job_key(job) in self.completed
+
+    def record(self, job):
+        with self.lock:
+            self.completed.add(job_key(job))
+            if not self.path:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"job": job_key(job), "completed_at": datetime.now().isoformat()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class FakeBackend:
+    """
+    Offline stand-in for genai.GenerativeModel: returns canned lessons/quizzes
+    and, if asked to, fails a fraction of calls so retries can be exercised.
+    """
+
+    def __init__(self, failure_rate=0.0, latency=0.0, seed=0):
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        with self.lock:
+            self.calls += 1
+            fail = self.random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if fail:
+            raise RuntimeError("fake backend: simulated transient failure")
+        topic = re.search(r'topic "([^"]+)"', prompt).group(1)
+        if "quiz" in prompt.lower():
+            data = {"title": f"{topic} Quiz", "questions": [
+                {"question": f"Question {i + 1} about {topic}?",
+                 "options": ["Option A", "Option B", "Option C", "Option D"],
+                 "answer": "Option A"} for i in range(50)
+            ]}
+        else:
+            data = {"title": topic, "content": [f"A brief and clear introduction to {topic}."]}
+        text = "```json\n" + json.dumps(data, indent=2) + "\n```"
+        if stream:
+            return [SimpleNamespace(text=text[i:i + 256]) for i in range(0, len(text), 256)]
+        return SimpleNamespace(text=text)
+
+
+def fetch(backend, job, prompt):
+    """
+    One generation call. Quizzes are streamed and validated question by question,
+    so malformed items are dropped or repaired without losing the whole quiz.
+    Returns (data, ingest stats or None).
+    """
+    if job.kind != "quiz":
+        response = backend.generate_content(prompt)
+        return json.loads(extract_json(response.text)), None
+    chunks = (chunk.text for chunk in backend.generate_content(prompt, stream=True))
+    quiz, stats = ingest_quiz_stream(chunks, default_title=f"{job.topic} Quiz")
+    if not quiz["questions"]:
+        raise ValueError(f"no valid questions in response ({stats['rejected']} rejected)")
+    return quiz, stats
+
+
+def run_job(backend, job, prompt, limiter, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE):
+    """Calls the backend until it returns usable JSON, backing off exponentially between attempts."""
+    for attempt in range(max_retries + 1):
+        limiter.wait()
+        try:
+            return fetch(backend, job, prompt)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_base * (2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"{job_key(job)}: attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def run_pipeline(backend, jobs, prompts, masters, checkpoint_file=None, max_workers=MAX_WORKERS,
+                 requests_per_minute=REQUESTS_PER_MINUTE, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 dedup=None):
+    """
+    Runs generation jobs on a bounded thread pool.
+    `prompts` and `masters` map a job kind to its prompt template and master file.
+    Each finished job is appended to its JSON Lines master and checkpointed right away;
+    jobs already in the checkpoint are skipped. With a QuestionDeduplicator as `dedup`,
+    quiz questions that duplicate one already seen are dropped before the append.
+    Returns a summary dict.
+    """
+    checkpoint = Checkpoint(checkpoint_file)
+    limiter = RateLimiter(requests_per_minute)
+    master_files = {kind: MasterFile(path) for kind, path in masters.items()}
+    pending = [job for job in jobs if not checkpoint.done(job)]
+    summary = {"skipped": len(jobs) - len(pending), "completed": 0, "failed": [],
+               "questions_accepted": 0, "questions_repaired": 0, "questions_rejected": 0,
+               "questions_duplicate": 0}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_job, backend, job, prompts[job.kind].format(topic=job.topic),
+                            limiter, max_retries, backoff_base): job
+            for job in pending
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                data, stats = future.result()
+            except Exception as e:
+                print(f"{job_key(job)}: giving up ({e})")
+                summary["failed"].append(job_key(job))
+                continue
+            if dedup is not None and job.kind == "quiz":
+                questions = dedup.filter(data["questions"], job.topic)
+                stats["duplicate"] = len(data["questions"]) - len(questions)
+                data["questions"] = questions
+            if job.kind != "quiz" or data["questions"]:
+                master_files[job.kind].append(data)
+            checkpoint.record(job)
+            summary["completed"] += 1
+            if stats is None:
+                print(f"{job_key(job)}: done")
+                continue
+            summary["questions_accepted"] += stats["accepted"]
+            summary["questions_repaired"] += stats["repaired"]
+            summary["questions_rejected"] += stats["rejected"]
+            summary["questions_duplicate"] += stats.get("duplicate", 0)
+            print(f"{job_key(job)}: done, {stats['accepted']} questions "
+                  f"({stats['repaired']} repaired, {stats['rejected']} rejected, "
+                  f"{stats.get('duplicate', 0)} duplicates dropped), "
+                  f"{stats['bytes'] / 1024:.0f} KB parsed at {stats['parse_mb_per_s']:.1f} MB/s")
+    return summary
@@ -0,0 +1,366 @@
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+
+from generation_control import (MAX_CONTEXT_TOKENS, MAX_NEW_TOKENS, MAX_QUESTION_TOKENS, GenerationController,
+                                truncate_tokens)
+import metrics
+from model_loader import load_model
+
+logger = logging.getLogger("app.inference_server")
+
+# Fixed system/few-shot part of every chatbot prompt. Its KV cache is computed
+# once in the worker and reused for every request.
+PROMPT_PREFIX = (
+    "You are a Python programming assistant. Provide accurate answers to questions about Python and include examples. "
+    "For example:\n\n"
+    "Q: How do I add two variables in Python?\n"
+    "A: To add two variables in Python, you can use the + operator. For example:\n"
+    "```python\n"
+    "a = 5\n"
+    "b = 10\n"
+    "c = a + b\n"
+    "print(c)  # Output: 15\n"
+    "```\n\n"
+)
+
+# Same repetition penalty model.generate used; token budgets live in generation_control
+REPETITION_PENALTY = 1.2
+
+# Dynamic batching: wait up to MAX_WAIT seconds for more requests after the first one
+MAX_BATCH_SIZE = 8
+MAX_WAIT = 0.02
+
+
+def context_block(context):
+    """Retrieved lesson passages, placed between the fixed prefix and the question."""
+    return f"Lesson notes:\n{context}\n\n" if context else ""
+
+
+def build_prompt(question, context=None):
+    return PROMPT_PREFIX + context_block(context) + f"Q: {question}\nA:"
+
+
+def _expand_cache(cache, batch_size):
+    """Copies the prefix KV cache once per row of the batch."""
+    if hasattr(cache, "batch_repeat_interleave"):
+        cache = copy.deepcopy(cache)
+        cache.batch_repeat_interleave(batch_size)
+        return cache
+    return tuple(
+        tuple(t.repeat(batch_size, *([1] * (t.dim() - 1))) for t in layer)
+        for layer in cache
+    )
+
+
+class BatchedGenerator:
+    """
+    Greedy decoder that runs several prompts through the model together.
+    All prompts share PROMPT_PREFIX, so only the question suffix is run through
+    the model per request; the prefix attention keys/values come from the cache.
+    """
+
+    def __init__(self, tokenizer, model, max_new_tokens=MAX_NEW_TOKENS, repetition_penalty=REPETITION_PENALTY):
+        import torch
+
+        self.torch = torch
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.device = next(model.parameters()).device
+        self.max_new_tokens = max_new_tokens
+        self.last_stats = []
+        self.repetition_penalty = repetition_penalty
+        self.eos_id = tokenizer.eos_token_id
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else self.eos_id
+
+        self.prefix_ids = tokenizer(PROMPT_PREFIX, return_tensors="pt")["input_ids"].to(self.device)
+        with torch.no_grad():
+            self.prefix_cache = self.model(self.prefix_ids, use_cache=True).past_key_values
+
+    def generate(self, questions, on_token=None, contexts=None):
+        """
+        Returns the decoded answer text for each question.
+        on_token(row, text), if given, is called with the row's streamable text after every new token.
+        contexts, if given, holds retrieved lesson text per question.
+        Questions and contexts are truncated to their token caps, and each row
+        stops on its own (see GenerationController); per-row token counts are
+        left in self.last_stats.
+        """
+        torch = self.torch
+        batch_size = len(questions)
+        prefix_len = self.prefix_ids.shape[1]
+        contexts = contexts or [None] * batch_size
+        questions = [truncate_tokens(self.tokenizer, q, MAX_QUESTION_TOKENS) for q in questions]
+        contexts = [truncate_tokens(self.tokenizer, c, MAX_CONTEXT_TOKENS)[0] if c else None for c in contexts]
+        context_ids = [self.tokenizer(context_block(c))["input_ids"] if c else [] for c in contexts]
+        question_ids = [self.tokenizer(f"Q: {q}\nA:")["input_ids"] for q, _ in questions]
+        suffixes = [c + q for c, q in zip(context_ids, question_ids)]
+        suffix_len = max(len(s) for s in suffixes)
+
+        # Left-pad the suffixes so every row's last prompt token lines up
+        suffix_ids = torch.full((batch_size, suffix_len), self.pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((batch_size, prefix_len + suffix_len), dtype=torch.long)
+        attention_mask[:, :prefix_len] = 1
+        for row, ids in enumerate(suffixes):
+            suffix_ids[row, suffix_len - len(ids):] = torch.tensor(ids)
+            attention_mask[row, prefix_len + suffix_len - len(ids):] = 1
+        suffix_ids = suffix_ids.to(self.device)
+        attention_mask = attention_mask.to(self.device)
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, prefix_len:]
+
+        tokens = torch.cat([self.prefix_ids.repeat(batch_size, 1), suffix_ids], dim=1)
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=self.device)
+        controllers = [GenerationController(self.tokenizer, self.max_new_tokens) for _ in range(batch_size)]
+
+        past = _expand_cache(self.prefix_cache, batch_size)
+        step_ids = suffix_ids
+        with torch.no_grad():
+            for step in range(self.max_new_tokens):
+                outputs = self.model(step_ids, past_key_values=past, attention_mask=attention_mask,
+                                     position_ids=position_ids, use_cache=True)
+                past = outputs.past_key_values
+                logits = outputs.logits[:, -1, :].float()
+
+                # Same repetition penalty model.generate applies
+                seen = logits.gather(1, tokens)
+                seen = torch.where(seen < 0, seen * self.repetition_penalty, seen / self.repetition_penalty)
+                logits.scatter_(1, tokens, seen)
+
+                next_ids = logits.argmax(dim=-1)
+                next_ids[finished] = self.pad_id
+                for row, controller in enumerate(controllers):
+                    if controller.finished:
+                        continue
+                    token_id = int(next_ids[row])
+                    if controller.add(token_id, token_id == self.eos_id):
+                        finished[row] = True
+                    if on_token is not None:
+                        on_token(row, controller.visible())
+                if finished.all():
+                    break
+
+                tokens = torch.cat([tokens, next_ids[:, None]], dim=1)
+                attention_mask = torch.cat([attention_mask, torch.ones((batch_size, 1), dtype=torch.long, device=self.device)], dim=1)
+                position_ids = position_ids[:, -1:] + 1
+                step_ids = next_ids[:, None]
+
+        self.last_stats = []
+        for controller, (_, truncated) in zip(controllers, questions):
+            stats = controller.stats()
+            stats["question_truncated"] = truncated
+            self.last_stats.append(stats)
+        return [controller.text() for controller in controllers]
+
+
+def _collect_batch(request_queue, max_batch_size, max_wait):
+    """Blocks for one request, then gathers whatever else arrives within max_wait."""
+    batch = [request_queue.get()]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size and batch[-1] is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(request_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _worker_main(request_queue, response_queue, loader, max_batch_size, max_wait):
+    """Worker process: loads the model once, then serves batches until it gets None."""
+    # Ctrl-C reaches the whole process group; the parent decides when the worker stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    tokenizer, model = loader()
+    generator = BatchedGenerator(tokenizer, model)
+    response_queue.put((None, "ready", None))
+
+    running = True
+    while running:
+        batch = _collect_batch(request_queue, max_batch_size, max_wait)
+        if batch[-1] is None:
+            running = False
+            batch = batch[:-1]
+        if not batch:
+            continue
+        request_ids = [request_id for request_id, _, _, _ in batch]
+        streaming = [stream for _, _, _, stream in batch]
+        sent = [""] * len(batch)
+
+        def send_token(row, text):
+            if not streaming[row] or not text.startswith(sent[row]) or len(text) == len(sent[row]):
+                return
+            response_queue.put((request_ids[row], "token", text[len(sent[row]):]))
+            sent[row] = text
+
+        try:
+            answers = generator.generate([question for _, question, _, _ in batch], on_token=send_token,
+                                         contexts=[context for _, _, context, _ in batch])
+            for request_id, answer, stats in zip(request_ids, answers, generator.last_stats):
+                response_queue.put((request_id, "done", (answer, stats)))
+        except Exception as e:
+            for request_id in request_ids:
+                response_queue.put((request_id, "error", repr(e)))
+
+
+class InferenceClient:
+    """
+    Front-end handle to the inference worker process.
+    submit() enqueues a question and returns a Future; a reader thread
+    resolves futures as answers come back. stream() yields text as it is generated.
+    """
+
+    def __init__(self, loader=load_model, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        context = multiprocessing.get_context("spawn")
+        self.request_queue = context.Queue()
+        self.response_queue = context.Queue()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.request_queue, self.response_queue, loader, max_batch_size, max_wait),
+            daemon=True
+        )
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.ready = threading.Event()
+        self.generation_totals = {"requests": 0, "generated_tokens": 0, "kept_tokens": 0, "question_truncated": 0}
+        self.reader = threading.Thread(target=self._read_responses, daemon=True)
+
+    def start(self):
+        self.process.start()
+        self.reader.start()
+        return self
+
+    def _fail_pending(self, message):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(message))
+
+    def _read_responses(self):
+        while True:
+            try:
+                request_id, event, payload = self.response_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self._fail_pending(f"Inference worker exited with code {self.process.exitcode}")
+                    return
+                continue
+            if event == "stopped":
+                return
+            self._handle_response(request_id, event, payload)
+
+    def _handle_response(self, request_id, event, payload):
+        if event == "ready":
+            self.ready.set()
+            return
+        if event == "token":
+            with self.lock:
+                _, on_token = self.pending.get(request_id, (None, None))
+            if on_token is not None:
+                on_token(payload)
+            return
+        with self.lock:
+            future, _ = self.pending.pop(request_id, (None, None))
+        if future is None:
+            return
+        if event == "done":
+            answer, stats = payload
+            self._record_stats(stats)
+            future.stats = stats
+            future.set_result(answer)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _record_stats(self, stats):
+        with self.lock:
+            totals = self.generation_totals
+            totals["requests"] += 1
+            totals["generated_tokens"] += stats["generated_tokens"]
+            totals["kept_tokens"] += stats["kept_tokens"]
+            totals["question_truncated"] += stats["question_truncated"]
+        metrics.inc("model_requests_total", stop_reason=stats["stop_reason"])
+        metrics.inc("model_generated_tokens_total", stats["generated_tokens"])
+        metrics.inc("model_kept_tokens_total", stats["kept_tokens"])
+        metrics.inc("model_questions_truncated_total", int(stats["question_truncated"]))
+        logger.info("Chatbot generation: %d tokens generated, %d kept (stopped by %s%s)",
+                    stats["generated_tokens"], stats["kept_tokens"], stats["stop_reason"],
+                    ", question truncated" if stats["question_truncated"] else "")
+
+    def get_generation_totals(self):
+        """Token counts summed over every answered request, to see how much generation is thrown away."""
+        with self.lock:
+            return dict(self.generation_totals)
+
+    def submit(self, question, on_token=None, context=None):
+        """
+        Queues a question; on_token(text), if given, receives each newly generated piece of text.
+        The returned future's result is the answer; once done it also has a .stats dict.
+        context is optional reference text (e.g. retrieved lesson passages) to ground the answer.
+        """
+        future = Future()
+        with self.lock:
+            request_id = next(self.ids)
+            self.pending[request_id] = (future, on_token)
+        self.request_queue.put((request_id, question, context, on_token is not None))
+        return future
+
+    def ask(self, question, timeout=None, context=None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(question, context=context).result(timeout=timeout)
+
+    def stream(self, question, timeout=None, context=None):
+        """Yields pieces of the answer text as the worker generates them."""
+        chunks = queue.Queue()
+        future = self.submit(question, on_token=chunks.put, context=context)
+        # The reader thread delivers every token before resolving the future
+        future.add_done_callback(lambda _: chunks.put(None))
+        while True:
+            chunk = chunks.get(timeout=timeout)
+            if chunk is None:
+                break
+            yield chunk
+        future.result()
+
+    def close(self):
+        self.request_queue.put(None)
+        self.process.join(timeout=10)
+        self.response_queue.put((None, "stopped", None))
+        self.reader.join(timeout=10)
+
+
+# Process-wide client shared by every session of the app
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client():
+    """
+    Starts the inference worker on first use and returns the shared client.
+    With INFERENCE_SERVER_ADDRESS set (multi-worker deployment, see launch.py)
+    it connects to the model server instead of starting a worker of its own.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            address = os.environ.get("INFERENCE_SERVER_ADDRESS")
+            if address:
+                from model_server import RemoteInferenceClient
+                _shared_client = RemoteInferenceClient(address).start()
+            else:
+                _shared_client = InferenceClient().start()
+        return _shared_client
+
+
+def warm_up_in_background():
+    """Starts the worker (and its model load) without blocking the caller."""
+    thread = threading.Thread(target=get_shared_client, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs running at once per server process; the inference worker batches up to 8 questions
+JOB_WORKERS = 8
+
+# Finished jobs stay queryable this long (seconds) so a session can pick up its result
+JOB_TTL = 600
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """
+    In-process job runner shared by every session. submit() returns a job ID at
+    once and the work runs on a thread pool; status() reports progress, partial
+    output and finally the result, so a script run only ever reads job state and
+    never waits on the work itself.
+    The job function is called as fn(report, *args); report(progress=, message=,
+    partial=) publishes how far it has got.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, ttl=JOB_TTL):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, fn, *args):
+        job_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self._expire()
+            self.jobs[job_id] = {
+                "id": job_id, "kind": kind, "status": QUEUED, "progress": 0.0, "message": "",
+                "partial": None, "result": None, "error": None,
+                "submitted": time.time(), "started": None, "finished": None
+            }
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status=RUNNING, started=time.time())
+
+        def report(progress=None, message=None, partial=None):
+            fields = {key: value for key, value in
+                      (("progress", progress), ("message", message), ("partial", partial)) if value is not None}
+            self._update(job_id, **fields)
+
+        try:
+            result = fn(report, *args)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e!r}")
+            self._update(job_id, status=FAILED, error=str(e), finished=time.time())
+        else:
+            self._update(job_id, status=DONE, progress=1.0, result=result, finished=time.time())
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job["finished"] and job["finished"] < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def status(self, job_id):
+        """A snapshot of the job's state, or None for an unknown (or expired) ID."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        """Number of jobs in each state."""
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        with self.lock:
+            for job in self.jobs.values():
+                counts[job["status"]] += 1
+        return counts
@@ -0,0 +1,105 @@
+"""
+Multi-worker deployment: one model server process plus several app.py
+front-ends (one Streamlit server each, on consecutive ports), all on this host.
+
+The front-ends send chatbot questions to the model server over a local socket,
+so the model is loaded once and questions from every front-end are batched
+together. Read-only content (quiz bank, search index, rendered lessons) is
+memory-mapped, so its pages are shared between the front-ends.
+
+Put a load balancer with sticky sessions in front of the ports.
+
+Run from the repository root:
+    python launch.py --workers 4 --port 8501
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+from multiprocessing.connection import Client
+
+from model_server import DEFAULT_ADDRESS
+
+
+def build_shared_content():
+    """
+    Builds the derived files up front, so the front-ends don't all rebuild them
+    at once on startup. (The rendered lesson cache is built by the first
+    front-end; it needs app.py's lesson menu and is safe to rebuild concurrently.)
+    """
+    from lesson_index import LessonIndex
+    from quiz_bank import ensure_quiz_bank
+    from search_index import ensure_search_index
+
+    start = time.perf_counter()
+    ensure_quiz_bank()
+    ensure_search_index()
+    LessonIndex().update()
+    print(f"Shared content ready in {time.perf_counter() - start:.1f}s")
+
+
+def wait_for_server(address, authkey, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Model server exited with code {process.returncode}")
+        try:
+            Client(address, family="AF_UNIX", authkey=authkey).close()
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Model server did not start listening on {address} within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several app front-ends sharing one model server.")
+    parser.add_argument("--workers", type=int, default=2, help="number of app.py front-end processes")
+    parser.add_argument("--port", type=int, default=8501, help="port of the first front-end")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="model server socket path")
+    parser.add_argument("--loader", default="model_loader:load_model")
+    args = parser.parse_args()
+
+    build_shared_content()
+
+    authkey = os.environ.get("INFERENCE_SERVER_AUTHKEY") or secrets.token_hex(16)
+    env = dict(os.environ, INFERENCE_SERVER_ADDRESS=args.address, INFERENCE_SERVER_AUTHKEY=authkey)
+    processes = [subprocess.Popen([sys.executable, "-m", "model_server", "--address", args.address,
+                                   "--loader", args.loader], env=env)]
+    try:
+        wait_for_server(args.address, authkey.encode("utf-8"), processes[0], timeout=60)
+        for i in range(args.workers):
+            port = args.port + i
+            # Each front-end persists its own answer cache; they would overwrite each other's file
+            worker_env = dict(env, ANSWER_CACHE_FILE=os.path.join("user_data", f"answer_cache.{port}.json"))
+            # Likewise its own metrics endpoint and file (see metrics.py)
+            if env.get("APP_METRICS_PORT"):
+                worker_env["APP_METRICS_PORT"] = str(int(env["APP_METRICS_PORT"]) + i)
+            if env.get("APP_METRICS_FILE"):
+                root, ext = os.path.splitext(env["APP_METRICS_FILE"])
+                worker_env["APP_METRICS_FILE"] = f"{root}.{port}{ext}"
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "streamlit", "run", "app.py", "--server.port", str(port),
+                 "--server.headless", "true"],
+                env=worker_env
+            ))
+            print(f"Front-end {i + 1}/{args.workers} on http://localhost:{port}")
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+        print("A process exited; shutting down")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in reversed(processes):
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
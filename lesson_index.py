@@ -0,0 +1,218 @@
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from answer_cache import content_words
+from content_store import BASE_DIR, MASTER_LESSONS_FILE, LESSON_FIELDS, _flatten, lesson_id, normalize_text
+from master_store import read_master
+
+# Persisted index: passages and term counts as JSON, optional dense vectors as .npy
+LESSON_INDEX_FILE = os.path.join(BASE_DIR, "lesson_index.json")
+LESSON_VECTORS_FILE = os.path.join(BASE_DIR, "lesson_index.npy")
+INDEX_VERSION = 2
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Share of the score given to dense similarity when vectors are available
+DENSE_WEIGHT = 0.3
+
+# Passages longer than this are cut before they go into a prompt
+MAX_PASSAGE_CHARS = 400
+
+
+def lesson_passages(lesson):
+    """
+    Splits a lesson into retrievable passages: one per section/module, plus one
+    for each remaining field (overview, key_concepts, ...).
+    """
+    title = lesson.get("title") or lesson.get("lessonTitle") or ""
+    passages = []
+    for field in LESSON_FIELDS:
+        value = lesson.get(field)
+        items = value if isinstance(value, list) and value and isinstance(value[0], dict) else [value]
+        for item in items:
+            text = " ".join(paragraph.replace("**", "") for paragraph in _flatten(item))
+            if text.strip():
+                passages.append({"title": title, "text": text})
+    return passages
+
+
+class LessonIndex:
+    """
+    BM25 index over lesson passages, optionally blended with dense vectors.
+    update() re-reads the master file only when it changed and tokenizes only
+    lessons it hasn't seen; search() scores every passage with NumPy.
+    Both take the index lock, so one instance can serve every job thread.
+    """
+
+    def __init__(self, index_file=LESSON_INDEX_FILE, vectors_file=LESSON_VECTORS_FILE, embedder=None):
+        self.index_file = index_file
+        self.vectors_file = vectors_file
+        self.embedder = embedder
+        self.source = {}
+        self.passages = []
+        self.vectors = None
+        self.lock = threading.Lock()
+        self._load()
+        self._build_arrays()
+
+    def _embedder_name(self):
+        if self.embedder is None:
+            return None
+        return f"{type(self.embedder).__name__}:{len(self.embedder.embed('probe'))}"
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.source = data["source"]
+        self.passages = data["passages"]
+        if (self.embedder is not None and data.get("embedder") == self._embedder_name()
+                and os.path.exists(self.vectors_file)):
+            vectors = np.load(self.vectors_file)
+            if len(vectors) == len(self.passages):
+                self.vectors = vectors
+
+    def save(self):
+        # Unique temp files: other processes may be saving the same index
+        directory = os.path.dirname(self.index_file) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "source": self.source, "embedder": self._embedder_name(),
+                       "passages": self.passages}, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.index_file)
+        if self.vectors is not None:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.vectors_file) or ".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, self.vectors)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.vectors_file)
+
+    def update(self, lessons_file=MASTER_LESSONS_FILE):
+        """Brings the index up to date with the master file; returns the number of passages added."""
+        with self.lock:
+            return self._update(lessons_file)
+
+    def _update(self, lessons_file):
+        if not os.path.exists(lessons_file):
+            return 0
+        stat = os.stat(lessons_file)
+        source = {"path": os.path.abspath(lessons_file), "mtime": stat.st_mtime, "size": stat.st_size}
+        needs_vectors = self.embedder is not None and self.vectors is None
+        if source == self.source and not needs_vectors:
+            return 0
+
+        current = {lesson_id(lesson): lesson for lesson in read_master(lessons_file) if isinstance(lesson, dict)}
+
+        # Keep passages of unchanged lessons, tokenize only the new ones
+        kept = [i for i, passage in enumerate(self.passages) if passage["lesson"] in current]
+        known = {self.passages[i]["lesson"] for i in kept}
+        seen_text = {normalize_text(self.passages[i]["text"]) for i in kept}
+        passages = [self.passages[i] for i in kept]
+        added = []
+        for digest, lesson in current.items():
+            if digest in known:
+                continue
+            for passage in lesson_passages(lesson):
+                key = normalize_text(passage["text"])
+                if key in seen_text:
+                    continue
+                seen_text.add(key)
+                passage["lesson"] = digest
+                passage["terms"] = Counter(content_words(passage["title"] + " " + passage["text"]))
+                added.append(passage)
+
+        if self.embedder is not None:
+            if needs_vectors:
+                vectors = [self.embedder.embed(p["text"]) for p in passages]
+            else:
+                vectors = list(self.vectors[kept])
+            vectors += [self.embedder.embed(p["text"]) for p in added]
+            self.vectors = np.array(vectors, dtype=np.float32) if vectors else None
+
+        self.passages = passages + added
+        self.source = source
+        self._build_arrays()
+        self.save()
+        return len(added)
+
+    def _build_arrays(self):
+        """Term -> posting arrays (passage numbers and term frequencies) for vectorized BM25."""
+        postings = {}
+        self.lengths = np.zeros(len(self.passages), dtype=np.float32)
+        for i, passage in enumerate(self.passages):
+            self.lengths[i] = sum(passage["terms"].values())
+            for term, count in passage["terms"].items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+        self.postings = {
+            term: (np.array(docs, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for term, (docs, counts) in postings.items()
+        }
+        self.average_length = float(self.lengths.mean()) if len(self.passages) else 0.0
+
+    def _bm25(self, query_terms):
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        n = len(self.passages)
+        for term in set(query_terms):
+            if term not in self.postings:
+                continue
+            docs, tf = self.postings[term]
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self.lengths[docs] / self.average_length)
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, question, k=3):
+        """Top-k passages for a question as dicts with title, text and score (best first)."""
+        with self.lock:
+            return self._search(question, k)
+
+    def _search(self, question, k):
+        if not self.passages:
+            return []
+        scores = self._bm25(content_words(question))
+        if scores.max() <= 0:
+            return []
+        if self.vectors is not None:
+            dense = self.vectors @ self.embedder.embed(question)
+            scores = (1 - DENSE_WEIGHT) * scores / scores.max() + DENSE_WEIGHT * np.clip(dense, 0, None)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"title": self.passages[i]["title"], "text": self.passages[i]["text"], "score": float(scores[i])}
+            for i in top if scores[i] > 0
+        ]
+
+
+def format_context(passages, max_chars=MAX_PASSAGE_CHARS):
+    """Passages as the bullet list that goes into the chatbot prompt."""
+    lines = []
+    for passage in passages:
+        text = re.sub(r"\s+", " ", passage["text"]).strip()
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + "..."
+        lines.append(f"- {text}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = LessonIndex()
+    added = index.update()
+    print(f"{len(index.passages)} passages ({added} new) in {time.perf_counter() - start:.2f}s -> {LESSON_INDEX_FILE}")
@@ -0,0 +1,233 @@
+import hashlib
+import html
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from content_store import BASE_DIR, LESSON_FIELDS, MASTER_LESSONS_FILE, lesson_id, topic_for_title
+from master_store import item_title, read_master
+
+# Keys whose text is code and goes into <pre> blocks
+CODE_KEYS = {"example", "example_code", "exampleCode", "code", "solution", "syntax"}
+HEADING_KEYS = ("title", "heading", "sectionTitle", "concept")
+
+# Headings shown above some top-level lesson fields
+FIELD_LABELS = {
+    "learning_objectives": "Learning objectives",
+    "learningObjectives": "Learning objectives",
+    "key_concepts": "Key concepts",
+    "exercises": "Exercises",
+    "summary": "Summary",
+}
+
+# Rendered lessons kept per process, keyed by content hash
+MAX_CACHED_LESSONS = 256
+
+# Pre-rendered lesson HTML, shared read-only by every app process through mmap
+LESSON_CACHE_FILE = os.path.join(BASE_DIR, "lesson_cache.bin")
+
+# File layout (all integers little-endian):
+#   header    magic, version, entry count, digest of the lesson menu it was built for
+#   entries   per rendered lesson (sorted by key): 64-bit content-hash key, blob offset, length
+#   blob      packed UTF-8 HTML
+MAGIC = b"LHTM"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxI8s")
+ENTRY_DTYPE = np.dtype([("key", "<u8"), ("offset", "<u4"), ("length", "<u4")])
+
+
+def _inline(text):
+    """Escapes text, then allows only `code` and **bold** markup."""
+    text = html.escape(str(text).strip())
+    text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+    text = re.sub(r"\*\*([^*]+)\*\*", r"<strong>\1</strong>", text)
+    return _one_line(text)
+
+
+def _code(text):
+    return f"<pre><code>{_one_line(html.escape(str(text).rstrip()))}</code></pre>"
+
+
+def _one_line(fragment):
+    # Newlines (and blank lines in particular) would end the HTML block inside
+    # st.markdown; "$" would be read as LaTeX
+    return fragment.replace("\n", "&#10;").replace("$", "&#36;")
+
+
+def _render(value, key, parts, depth):
+    if value is None or value == "" or value == [] or value == {}:
+        return
+    if isinstance(value, (str, int, float)):
+        if key in CODE_KEYS:
+            parts.append(_code(value))
+        else:
+            parts.append(f"<p>{_inline(value)}</p>")
+    elif isinstance(value, list):
+        if all(isinstance(item, (str, int, float)) for item in value) and key not in CODE_KEYS:
+            css_class = " class='key-concepts'" if key in ("key_concepts", "keywords") else ""
+            items = "".join(f"<li>{_inline(item)}</li>" for item in value if str(item).strip())
+            parts.append(f"<ul{css_class}>{items}</ul>")
+        else:
+            for item in value:
+                _render(item, key, parts, depth)
+    elif isinstance(value, dict):
+        heading = next((value[k] for k in HEADING_KEYS if value.get(k)), None)
+        if heading:
+            level = min(depth + 3, 5)
+            parts.append(f"<h{level}>{_inline(heading)}</h{level}>")
+        for child_key, child in value.items():
+            if child_key not in HEADING_KEYS:
+                _render(child, child_key, parts, depth + 1)
+
+
+def render_lesson(lesson, title):
+    """The whole lesson as one sanitized HTML fragment (every generated string is escaped)."""
+    parts = [f"<div class='lesson-card'><h2>{_inline(title)}</h2>"]
+    for field in LESSON_FIELDS:
+        if not lesson.get(field):
+            continue
+        if field in FIELD_LABELS:
+            parts.append(f"<h3>{FIELD_LABELS[field]}</h3>")
+        _render(lesson[field], field, parts, 0)
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def _cache_key(lesson, title):
+    """64-bit key of one rendering: the lesson's content_store.lesson_id plus the title it is shown under."""
+    key = f"{lesson_id(lesson)}\x1f{title}"
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+
+
+def _menu_digest(menu):
+    return hashlib.sha1(json.dumps(list(menu), sort_keys=True).encode("utf-8")).digest()[:8]
+
+
+class LessonRenderCache:
+    """Rendered lesson HTML shared by every session in the process, keyed by content hash (LRU)."""
+
+    def __init__(self, max_entries=MAX_CACHED_LESSONS):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lesson, title):
+        key = _cache_key(lesson, title)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        rendered = render_lesson(lesson, title)
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = rendered
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return rendered
+
+
+def build_lesson_cache(lessons_file=MASTER_LESSONS_FILE, menu=(), out_file=LESSON_CACHE_FILE):
+    """
+    Renders every lesson in the master under its own title (as search shows it)
+    and the newest lesson of each topic under its menu title; `menu` is a list
+    of {"title", "topic"} dicts like app.py's lesson menu.
+    """
+    rendered = {}
+    newest = {}
+    for lesson in read_master(lessons_file):
+        title = item_title(lesson)
+        rendered[_cache_key(lesson, title)] = render_lesson(lesson, title)
+        topic = topic_for_title(title)
+        if topic:
+            newest[topic] = lesson
+    for entry in menu:
+        lesson = newest.get(entry["topic"])
+        if lesson is not None:
+            rendered[_cache_key(lesson, entry["title"])] = render_lesson(lesson, entry["title"])
+
+    entries = np.zeros(len(rendered), dtype=ENTRY_DTYPE)
+    blobs = []
+    offset = 0
+    for i, key in enumerate(sorted(rendered)):
+        data = rendered[key].encode("utf-8")
+        entries[i] = (key, offset, len(data))
+        blobs.append(data)
+        offset += len(data)
+
+    # Front-ends may rebuild at the same time; each writes its own temp file and the rename wins
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(out_file) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), _menu_digest(menu)))
+        f.write(entries.tobytes())
+        for data in blobs:
+            f.write(data)
+    os.chmod(tmp_file, 0o644)
+    os.replace(tmp_file, out_file)
+    return out_file
+
+
+def _built_for(out_file):
+    """(version, menu digest) of an existing cache file."""
+    with open(out_file, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:4] != MAGIC:
+        return None, None
+    _, version, _, menu_digest = HEADER.unpack(header)
+    return version, menu_digest
+
+
+def ensure_lesson_cache(lessons_file=MASTER_LESSONS_FILE, menu=(), out_file=LESSON_CACHE_FILE):
+    """Rebuilds the cache if it is missing, older than the master file or built for another menu."""
+    if (not os.path.exists(out_file)
+            or (os.path.exists(lessons_file) and os.path.getmtime(out_file) < os.path.getmtime(lessons_file))
+            or _built_for(out_file) != (VERSION, _menu_digest(menu))):
+        build_lesson_cache(lessons_file, menu, out_file)
+    return out_file
+
+
+class MappedLessonCache:
+    """
+    Pre-rendered lesson HTML read straight from the shared mapped pages; lessons
+    that are not in the file (generated since it was built) go to a per-process
+    LessonRenderCache.
+    """
+
+    def __init__(self, cache_file=LESSON_CACHE_FILE, fallback=None):
+        with open(cache_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_entries, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{cache_file} is not a version {VERSION} lesson cache")
+        self.entries = np.frombuffer(self._mm, dtype=ENTRY_DTYPE, count=n_entries, offset=HEADER.size)
+        self._blob_at = HEADER.size + n_entries * ENTRY_DTYPE.itemsize
+        self.fallback = fallback if fallback is not None else LessonRenderCache()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def misses(self):
+        return self.fallback.hits + self.fallback.misses
+
+    def get(self, lesson, title):
+        key = _cache_key(lesson, title)
+        i = int(np.searchsorted(self.entries["key"], np.uint64(key)))
+        if i < len(self.entries) and int(self.entries[i]["key"]) == key:
+            self.hits += 1
+            start = self._blob_at + int(self.entries[i]["offset"])
+            return str(self._mm[start:start + int(self.entries[i]["length"])], "utf-8")
+        return self.fallback.get(lesson, title)
+
+    def close(self):
+        self._mm.close()
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+import metrics
+
+# Master files are JSON Lines: one lesson or quiz per line, only ever appended to.
+# "<master>.idx" maps titles to byte offsets and is rebuilt from the master if missing or stale.
+INDEX_SUFFIX = ".idx"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def locked(path):
+    """
+    Holds the lock appends take on a master (this process's and, where flock
+    exists, other processes'), for jobs that rewrite the whole file.
+    """
+    with _lock_for(path), open(path, "rb") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def item_title(item):
+    return item.get("title") or item.get("lessonTitle") or ""
+
+
+def encode_item(item):
+    return (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def read_master(path):
+    """Yields the items of a master file in order; a torn last line (crash mid-append) is skipped."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def _scan(f, start):
+    """(title, offset, end) for every complete line from byte `start` on."""
+    entries = []
+    f.seek(start)
+    offset = start
+    for line in f:
+        if not line.endswith(b"\n"):
+            break
+        end = offset + len(line)
+        if line.strip():
+            entries.append((item_title(json.loads(line)), offset, end))
+        offset = end
+    return entries
+
+
+class MasterFile:
+    """
+    Append-only JSON Lines master with a title -> offsets side index.
+    append() writes one line and fsyncs it, so a crash can at worst leave a
+    torn last line, which readers skip and the next append cuts off.
+    get(title) seeks straight to the newest item with that title.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.offsets = {}
+        self.indexed_upto = 0
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        entries.append(json.loads(line))
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if entries and entries[-1][2] > size:
+            # The master was replaced (e.g. compacted) behind the index's back
+            entries = []
+            open(self.index_path, "w").close()
+        self.offsets = {}
+        self.indexed_upto = 0
+        self._add_entries(entries)
+        if self.indexed_upto < size:
+            self.refresh()
+
+    def _add_entries(self, entries):
+        for title, offset, end in entries:
+            self.offsets.setdefault(title, []).append(offset)
+            self.indexed_upto = end
+
+    def refresh(self):
+        """Indexes lines appended since the index was last written (by this or another process)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            entries = _scan(f, self.indexed_upto)
+        if entries:
+            if self.indexed_upto == 0:
+                open(self.index_path, "w").close()
+            self._write_index(entries)
+            self._add_entries(entries)
+
+    def _write_index(self, entries):
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(list(entry), ensure_ascii=False) + "\n")
+
+    def append(self, item):
+        """Appends one item durably; returns its byte offset."""
+        data = encode_item(item)
+        with _lock_for(self.path):
+            while True:
+                with open(self.path, "ab+") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        if os.fstat(f.fileno()).st_ino != os.stat(self.path).st_ino:
+                            # Rewritten (compacted or deduplicated) while we waited: append to the new file
+                            self._load_index()
+                            continue
+                        size = f.seek(0, os.SEEK_END)
+                        if size < self.indexed_upto:
+                            self._load_index()  # Rewritten since this object last indexed it
+                        if size > self.indexed_upto:
+                            self.refresh()
+                        if size > self.indexed_upto:
+                            # Cut off a torn line left by a crashed writer
+                            f.truncate(self.indexed_upto)
+                        offset = self.indexed_upto
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        metrics.inc("app_file_bytes_total", len(data), store="master", op="write")
+                        entry = (item_title(item), offset, offset + len(data))
+                        self._write_index([entry])
+                        self._add_entries([entry])
+                        return offset
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f, fcntl.LOCK_UN)
+
+    def titles(self):
+        return list(self.offsets)
+
+    def get(self, title):
+        """Newest item with this title, or None."""
+        self.refresh()
+        offsets = self.offsets.get(title)
+        if not offsets:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offsets[-1])
+            return json.loads(f.readline())
+
+
+def compact(path):
+    """
+    Rewrites a master in one streaming pass, dropping exact duplicate items and
+    any torn line; the index is rewritten alongside. Returns (kept, dropped).
+    Run it while no generation is in progress: open MasterFiles keep their offsets.
+    """
+    seen = set()
+    kept = dropped = 0
+    directory = os.path.dirname(path) or "."
+    with _lock_for(path), open(path, "rb") as src:
+        if fcntl is not None:
+            fcntl.flock(src, fcntl.LOCK_EX)
+        try:
+            out_fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            index_fd, tmp_index_path = tempfile.mkstemp(dir=directory, suffix=INDEX_SUFFIX + ".tmp")
+            with os.fdopen(out_fd, "wb") as out, os.fdopen(index_fd, "w", encoding="utf-8") as index:
+                offset = 0
+                for line in src:
+                    if not line.endswith(b"\n") or not line.strip():
+                        continue
+                    item = json.loads(line)
+                    digest = hashlib.sha1(json.dumps(item, sort_keys=True).encode("utf-8")).digest()
+                    if digest in seen:
+                        dropped += 1
+                        continue
+                    seen.add(digest)
+                    data = encode_item(item)
+                    out.write(data)
+                    index.write(json.dumps([item_title(item), offset, offset + len(data)], ensure_ascii=False) + "\n")
+                    offset += len(data)
+                    kept += 1
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.chmod(tmp_index_path, 0o644)
+            os.replace(tmp_path, path)
+            os.replace(tmp_index_path, path + INDEX_SUFFIX)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(src, fcntl.LOCK_UN)
+    return kept, dropped
+
+
+def convert(json_path, jsonl_path):
+    """One-time conversion of a legacy JSON-array master; returns the number of items written."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(jsonl_path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        for item in items:
+            f.write(encode_item(item))
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, jsonl_path)
+    if os.path.exists(jsonl_path + INDEX_SUFFIX):
+        os.remove(jsonl_path + INDEX_SUFFIX)
+    MasterFile(jsonl_path)  # Builds the index
+    return len(items)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the JSON Lines master files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_parser = commands.add_parser("compact", help="drop duplicate items and rewrite the index")
+    compact_parser.add_argument("paths", nargs="+")
+    convert_parser = commands.add_parser("convert", help="convert a legacy JSON array master (x.json -> x.jsonl)")
+    convert_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if args.command == "compact":
+            kept, dropped = compact(path)
+            print(f"{path}: kept {kept} items, dropped {dropped} duplicates")
+        else:
+            target = os.path.splitext(path)[0] + ".jsonl"
+            print(f"{path} -> {target}: {convert(path, target)} items")
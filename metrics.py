@@ -0,0 +1,327 @@
+import bisect
+import cProfile
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # Slow reruns are profiled with cProfile instead
+    Profiler = None
+
+# Off unless configured: with metrics disabled every hook below returns at once
+METRICS_FILE = os.environ.get("APP_METRICS_FILE")
+METRICS_PORT = os.environ.get("APP_METRICS_PORT")
+ENABLED = os.environ.get("APP_METRICS") == "1" or bool(METRICS_FILE or METRICS_PORT)
+
+# How often (seconds) the metrics file is rewritten
+METRICS_INTERVAL = float(os.environ.get("APP_METRICS_INTERVAL", 15))
+
+# Reruns slower than this (milliseconds) are profiled into PROFILE_DIR; unset means no profiling
+SLOW_RERUN_MS = os.environ.get("APP_PROFILE_SLOW_MS")
+PROFILE_DIR = os.path.join("user_data", "profiles")
+
+# One rerun is profiled at a time; a profiled run older than this (seconds) was abandoned by its session
+PROFILE_TIMEOUT = 300
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Registry:
+    """Process-wide counters and histograms, plus collectors that report snapshot values at export time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+
+    def inc(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts (made cumulative on export), then sum and count
+                histogram = self.histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+            i = bisect.bisect_left(BUCKETS, value)
+            if i < len(BUCKETS):
+                histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: list(histogram) for key, histogram in self.histograms.items()}
+            collectors = list(self.collectors)
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault((name, "counter"), []).append((name, labels, value))
+        for collector in collectors:
+            for name, kind, labels, value in collector():
+                samples.setdefault((name, kind), []).append((name, tuple(sorted(labels.items())), value))
+        for (name, labels), histogram in histograms.items():
+            lines = samples.setdefault((name, "histogram"), [])
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram):
+                cumulative += count
+                lines.append((name + "_bucket", labels + (("le", repr(bound)),), cumulative))
+            lines.append((name + "_bucket", labels + (("le", "+Inf"),), histogram[-1]))
+            lines.append((name + "_sum", labels, histogram[-2]))
+            lines.append((name + "_count", labels, histogram[-1]))
+
+        out = []
+        for (name, kind), lines in sorted(samples.items()):
+            out.append(f"# TYPE {name} {kind}")
+            for sample, labels, value in lines:
+                value = value if isinstance(value, int) else repr(float(value))
+                out.append(f"{sample}{_format_labels(labels)} {value}")
+        return "\n".join(out) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+
+
+def inc(name, value=1, **labels):
+    """Adds to a counter."""
+    if not ENABLED:
+        return
+    REGISTRY.inc(name, value, labels)
+
+
+def observe(name, value, **labels):
+    """Records one value (seconds, for the default buckets) in a histogram."""
+    if not ENABLED:
+        return
+    REGISTRY.observe(name, value, labels)
+
+
+def add_collector(collector):
+    """
+    Registers collector() -> iterable of (name, "counter" or "gauge", labels dict, value),
+    called only when metrics are exported; for stats a component already keeps.
+    """
+    if not ENABLED:
+        return
+    with REGISTRY.lock:
+        REGISTRY.collectors.append(collector)
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, self.labels)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager recording the block's duration in histogram `name`."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+class Rerun:
+    """One script run: its session, start time, labels (e.g. the menu page) and, for slow-rerun capture, a profiler."""
+
+    def __init__(self, session):
+        self.session = session
+        self.labels = {}
+        self.profiler = None
+        self.start = time.perf_counter()
+
+    def start_profiler(self):
+        if Profiler is not None:
+            self.profiler = Profiler()
+            self.profiler.start()
+            return
+        self.profiler = cProfile.Profile()
+        try:
+            self.profiler.enable()
+        except ValueError:  # Python 3.12+: another profiler is already active in this process
+            self.profiler = None
+
+    def stop_profiler(self):
+        if self.profiler is None:
+            return
+        if Profiler is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+
+# Unfinished runs by session (Streamlit may run a session's next script on another thread)
+_reruns = {}
+_reruns_lock = threading.Lock()
+_profiled = None
+
+
+def _end(rerun):
+    """Stops the run's profiler and releases the profiling slot (caller holds _reruns_lock)."""
+    global _profiled
+    rerun.stop_profiler()
+    if _profiled is rerun:
+        _profiled = None
+
+
+def start_rerun(session=None):
+    """
+    Call at the top of the script with the session's ID. The session's previous
+    run, if it never reached finish_rerun() (an exception, or st.rerun()
+    partway through), is counted as interrupted.
+    """
+    global _profiled
+    if not ENABLED:
+        return None
+    rerun = Rerun(session)
+    with _reruns_lock:
+        previous = _reruns.get(session)
+        _reruns[session] = rerun
+        if previous is not None:
+            _end(previous)
+            REGISTRY.inc("app_reruns_interrupted_total", 1, previous.labels)
+        if _profiled is not None and rerun.start - _profiled.start > PROFILE_TIMEOUT:
+            _end(_profiled)
+        profile = SLOW_RERUN_MS and _profiled is None
+        if profile:
+            _profiled = rerun
+    if profile:
+        rerun.start_profiler()
+        rerun.start = time.perf_counter()
+    return rerun
+
+
+def label_rerun(rerun, **labels):
+    """Adds labels (e.g. menu=) to the run's histogram once they are known."""
+    if rerun is not None:
+        rerun.labels.update(labels)
+
+
+def finish_rerun(rerun):
+    """Call at the end of the script: records the run time and saves a profile if it was slow."""
+    if rerun is None:
+        return
+    elapsed = time.perf_counter() - rerun.start
+    with _reruns_lock:
+        if _reruns.get(rerun.session) is rerun:
+            del _reruns[rerun.session]
+        _end(rerun)
+    REGISTRY.observe("app_rerun_seconds", elapsed, rerun.labels)
+    if rerun.profiler is not None and elapsed * 1000 >= float(SLOW_RERUN_MS):
+        path = save_profile(rerun, elapsed)
+        REGISTRY.inc("app_slow_reruns_total", 1, rerun.labels)
+        print(f"Slow rerun ({', '.join(map(str, rerun.labels.values()))}) took {elapsed * 1000:.0f}ms: "
+              f"profile -> {path}")
+
+
+def save_profile(rerun, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    page = re.sub(r"\W+", "", "-".join(map(str, rerun.labels.values()))) or "rerun"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{page}-{elapsed * 1000:.0f}ms"
+    if Profiler is not None:
+        path = os.path.join(PROFILE_DIR, name + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(rerun.profiler.output_html())
+    else:
+        path = os.path.join(PROFILE_DIR, name + ".prof")
+        rerun.profiler.dump_stats(path)  # View with: python -m pstats <file>
+    return path
+
+
+def write_file(path):
+    """Writes the current metrics to `path` atomically (for node_exporter's textfile collector and the like)."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def _metrics_server(port):
+    # http.server is only imported when the endpoint is turned on
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the app's log
+
+    return ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_INTERVAL):
+    """
+    Once per process: serves /metrics on 127.0.0.1:`port` and/or rewrites the
+    metrics file every `interval` seconds, as configured.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if not ENABLED or _exporters_started:
+            return
+        _exporters_started = True
+    if port:
+        server = _metrics_server(int(port))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Metrics on http://127.0.0.1:{port}/metrics")
+    if path:
+        def write_periodically():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_file(path)
+                except OSError as e:
+                    print(f"Couldn't write metrics to {path}: {e}")
+        threading.Thread(target=write_periodically, daemon=True).start()
+        print(f"Metrics written to {path} every {interval:g}s")
+
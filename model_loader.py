@@ -0,0 +1,120 @@
+import os
+import time
+
+# Programming-specific model used by the Chatbot
+MODEL_NAME = "Salesforce/codegen-350M-mono"
+
+# "auto" picks a dtype for the hardware found; "fp32", "bf16", "fp16" and "int8" force one.
+# int8 is dynamic quantization of the Linear layers, for CPU hosts.
+MODEL_MODE = os.environ.get("MODEL_MODE", "auto")
+MODEL_THREADS = os.environ.get("MODEL_THREADS")
+
+# Pre-converted snapshots, so later startups skip downloading and converting
+SNAPSHOT_DIR = os.path.join("models", "snapshots")
+
+MODES = ("fp32", "bf16", "fp16", "int8")
+
+
+def cpu_supports_bf16():
+    """True if this CPU has native bfloat16 matmul support (AVX512-BF16 / AMX)."""
+    import torch
+
+    checker = getattr(torch.backends.cpu, "get_cpu_capability", None)
+    if checker is not None and checker() in ("AVX512_BF16", "AMX"):
+        return True
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def resolve_mode(mode=MODEL_MODE):
+    """Turns "auto" into a concrete mode for the hardware found."""
+    import torch
+
+    if mode != "auto":
+        if mode not in MODES:
+            raise ValueError(f"Unknown model mode: {mode}")
+        return mode
+    if torch.cuda.is_available():
+        return "fp16"
+    if cpu_supports_bf16():
+        return "bf16"
+    return "fp32"
+
+
+def configure_threads(num_threads=MODEL_THREADS):
+    """Sets torch intra-op threads explicitly (default: one per physical core if known)."""
+    import torch
+
+    if num_threads is None:
+        num_threads = max(1, (os.cpu_count() or 2) // 2)
+    torch.set_num_threads(int(num_threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already set once parallel work has started
+    return int(num_threads)
+
+
+def snapshot_path(mode, model_name=MODEL_NAME, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"{model_name.replace('/', '--')}-{mode}")
+
+
+def _convert(model, mode):
+    import torch
+
+    if mode == "int8":
+        model = model.float()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    dtype = {"fp32": torch.float32, "bf16": torch.bfloat16, "fp16": torch.float16}[mode]
+    return model.to(dtype)
+
+
+def save_snapshot(tokenizer, model, mode, path):
+    """Writes a converted model so load_model() can reuse it without converting again."""
+    import torch
+
+    os.makedirs(path, exist_ok=True)
+    tokenizer.save_pretrained(path)
+    if mode == "int8":
+        # Quantized modules can't round-trip through save_pretrained; pickle the whole module
+        torch.save(model, os.path.join(path, "model_int8.pt"))
+    else:
+        model.save_pretrained(path)
+
+
+def load_model(mode=MODEL_MODE, model_name=MODEL_NAME, snapshot_dir=SNAPSHOT_DIR, num_threads=MODEL_THREADS):
+    """
+    Loads the chatbot tokenizer and model in the requested mode.
+    Uses a local snapshot when one exists; otherwise converts the hub model and saves a snapshot.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    configure_threads(num_threads)
+    mode = resolve_mode(mode)
+    path = snapshot_path(mode, model_name, snapshot_dir)
+    start = time.perf_counter()
+
+    if os.path.isdir(path):
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        if mode == "int8":
+            model = torch.load(os.path.join(path, "model_int8.pt"), weights_only=False)
+        else:
+            model = AutoModelForCausalLM.from_pretrained(path, torch_dtype="auto")
+        source = "snapshot"
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+        model = _convert(model, mode)
+        if snapshot_dir:
+            save_snapshot(tokenizer, model, mode, path)
+        source = "hub"
+
+    if mode == "fp16" and torch.cuda.is_available():
+        model = model.to("cuda")
+    print(f"Loaded {model_name} ({mode}) from {source} in {time.perf_counter() - start:.1f}s")
+    return tokenizer, model.eval()
@@ -0,0 +1,158 @@
+import argparse
+import importlib
+import itertools
+import os
+import signal
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+from inference_server import MAX_BATCH_SIZE, MAX_WAIT, InferenceClient
+from model_loader import load_model
+
+# Local socket the model server listens on when several app processes share one model
+DEFAULT_ADDRESS = os.path.join("/tmp", f"learning-app-model-{os.getuid()}.sock")
+
+# Wire protocol (pickled tuples over a multiprocessing connection), the same
+# messages the in-process worker uses:
+#   front-end -> server  (request_id, question, context, stream)
+#   server -> front-end  (request_id, event, payload) with event "ready", "token", "done" or "error"
+
+
+def resolve_loader(spec):
+    """Turns "module:function" into the loader it names."""
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name or "load_model")
+
+
+def _authkey():
+    key = os.environ.get("INFERENCE_SERVER_AUTHKEY")
+    return key.encode("utf-8") if key else None
+
+
+class ModelServer:
+    """
+    Hosts one InferenceClient (so one copy of the model and one batching worker)
+    and serves it to any number of app processes over a Unix socket. Questions
+    from every connection land in the same batches.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, loader=load_model, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait=MAX_WAIT):
+        self.address = address
+        self.client = InferenceClient(loader, max_batch_size, max_wait)
+        self.connections = 0
+
+    def serve_forever(self):
+        self.client.start()
+        if os.path.exists(self.address):
+            os.remove(self.address)  # Left over from a server that did not shut down cleanly
+        old_umask = os.umask(0o177)  # Socket only usable by this user
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=_authkey())
+        finally:
+            os.umask(old_umask)
+        print(f"Model server listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:  # e.g. a client with the wrong authkey
+                    print(f"Rejected connection: {e!r}")
+                    continue
+                self.connections += 1
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            self.client.close()
+
+    def _serve(self, conn):
+        send_lock = threading.Lock()
+
+        def send(message):
+            with send_lock:
+                try:
+                    conn.send(message)
+                except OSError:
+                    pass  # The front-end went away; its answers are dropped
+
+        def announce_ready():
+            self.client.ready.wait()
+            send((None, "ready", None))
+
+        def finished(request_id, future):
+            if future.exception() is not None:
+                send((request_id, "error", str(future.exception())))
+            else:
+                send((request_id, "done", (future.result(), future.stats)))
+
+        threading.Thread(target=announce_ready, daemon=True).start()
+        while True:
+            try:
+                request_id, question, context, stream = conn.recv()
+            except (EOFError, OSError):
+                break
+            on_token = (lambda text, request_id=request_id: send((request_id, "token", text))) if stream else None
+            future = self.client.submit(question, on_token=on_token, context=context)
+            future.add_done_callback(lambda future, request_id=request_id: finished(request_id, future))
+        conn.close()
+
+
+class _ConnectionSender:
+    """Stands in for the request queue: puts go straight onto the socket."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def put(self, message):
+        with self.lock:
+            self.conn.send(message)
+
+
+class RemoteInferenceClient(InferenceClient):
+    """
+    InferenceClient whose worker is the shared model server instead of a child
+    process; submit(), ask(), stream() and the generation totals work the same.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self.conn = None
+        self.request_queue = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.ready = threading.Event()
+        self.generation_totals = {"requests": 0, "generated_tokens": 0, "kept_tokens": 0, "question_truncated": 0}
+        self.reader = threading.Thread(target=self._read_responses, daemon=True)
+
+    def start(self):
+        self.conn = Client(self.address, family="AF_UNIX", authkey=_authkey())
+        self.request_queue = _ConnectionSender(self.conn)
+        self.reader.start()
+        return self
+
+    def _read_responses(self):
+        while True:
+            try:
+                request_id, event, payload = self.conn.recv()
+            except (EOFError, OSError):
+                self._fail_pending(f"Lost the connection to the model server at {self.address}")
+                return
+            self._handle_response(request_id, event, payload)
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the chatbot model to several app processes.")
+    parser.add_argument("--address", default=os.environ.get("INFERENCE_SERVER_ADDRESS", DEFAULT_ADDRESS))
+    parser.add_argument("--loader", default="model_loader:load_model", help="module:function returning (tokenizer, model)")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT)
+    args = parser.parse_args()
+    # Exit through serve_forever's cleanup (socket removed, worker stopped) when the launcher stops us
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    ModelServer(args.address, resolve_loader(args.loader), args.max_batch_size, args.max_wait).serve_forever()
@@ -0,0 +1,594 @@
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: JSON updates are only serialized within this process
+    fcntl = None
+
+import metrics
+
+# Where per-user progress lives
+PROGRESS_DIR = "user_data"
+PROGRESS_DB = os.path.join(PROGRESS_DIR, "progress.db")
+# The single record app.py kept before progress was stored per user
+LEGACY_PROGRESS_FILE = os.path.join(PROGRESS_DIR, "progress.json")
+PROGRESS_BACKEND = os.environ.get("PROGRESS_BACKEND", "sqlite")
+
+
+def default_progress():
+    """Progress record for a user that has never been seen before."""
+    return {
+        "completed_lessons": [],
+        "quiz_scores": {},
+        "last_learning_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "streak_count": 1,
+        "badges": [],
+        "learning_goal": {},
+        "question_history": {},
+        "review_cards": {}
+    }
+
+
+def load_legacy_progress(path=LEGACY_PROGRESS_FILE):
+    """
+    The pre-upgrade progress record as a batch of changes (see ProgressBackend.apply),
+    or None if there is none. It was shared by every learner, so each learner
+    without stored progress starts from it.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Couldn't import legacy progress from {path}: {e}")
+        return None
+    changes = {
+        "completed_lessons": list(record.get("completed_lessons", [])),
+        "quiz_scores": dict(record.get("quiz_scores", {})),
+        "badges": list(record.get("badges", []))
+    }
+    if "streak_count" in record and "last_learning_time" in record:
+        changes["streak"] = (record["streak_count"], record["last_learning_time"])
+    if record.get("learning_goal"):
+        changes["learning_goal"] = record["learning_goal"]
+    return changes
+
+
+class ProgressBackend:
+    """
+    Storage interface for per-user progress.
+    Every mutation touches only the field it changes, so two sessions updating
+    different fields (or different users) never overwrite each other.
+    `legacy_progress` (from load_legacy_progress) seeds users seen for the first time.
+    """
+
+    legacy_progress = None
+
+    def load(self, username):
+        raise NotImplementedError
+
+    def add_completed_lesson(self, username, lesson):
+        raise NotImplementedError
+
+    def set_quiz_score(self, username, quiz, score):
+        raise NotImplementedError
+
+    def set_streak(self, username, streak_count, last_learning_time):
+        raise NotImplementedError
+
+    def add_badge(self, username, badge):
+        raise NotImplementedError
+
+    def set_learning_goal(self, username, goal):
+        raise NotImplementedError
+
+    def record_answers(self, username, history):
+        """Adds {question_id: [attempts, correct]} increments to the per-question history."""
+        raise NotImplementedError
+
+    def set_review_cards(self, username, cards):
+        """Stores spaced-repetition cards: {question_id: [easiness, interval, repetitions, due]}."""
+        raise NotImplementedError
+
+    def apply(self, username, changes):
+        """
+        Applies a batch of changes (as collected by ProgressSession) in one write.
+        Backends override this; the fallback issues one mutation per change.
+        """
+        for lesson in changes.get("completed_lessons", []):
+            self.add_completed_lesson(username, lesson)
+        for quiz, score in changes.get("quiz_scores", {}).items():
+            self.set_quiz_score(username, quiz, score)
+        if "streak" in changes:
+            self.set_streak(username, *changes["streak"])
+        for badge in changes.get("badges", []):
+            self.add_badge(username, badge)
+        if "learning_goal" in changes:
+            self.set_learning_goal(username, changes["learning_goal"])
+        if "question_history" in changes:
+            self.record_answers(username, changes["question_history"])
+        if "review_cards" in changes:
+            self.set_review_cards(username, changes["review_cards"])
+
+
+class JsonProgressBackend(ProgressBackend):
+    """
+    One JSON file per user. Read-modify-write cycles hold a process-wide lock
+    and the user's lock file (flock), so app processes sharing the directory
+    don't lose each other's updates.
+    """
+
+    def __init__(self, directory=os.path.join(PROGRESS_DIR, "progress")):
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, username):
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in username)
+        return os.path.join(self.directory, f"{safe_name}.json")
+
+    def _read(self, username):
+        path = self._path(username)
+        progress = default_progress()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                progress.update(json.load(f))
+                metrics.inc("app_file_bytes_total", f.tell(), store="progress", op="read")
+        return progress
+
+    def _write(self, username, progress):
+        # Write a temp file and rename it over the old one, so a crash never leaves a torn file
+        path = self._path(username)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(progress, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.inc("app_file_bytes_total", f.tell(), store="progress", op="write")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _update(self, username):
+        with self.lock, open(os.path.splitext(self._path(username))[0] + ".lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            progress = self._read(username)
+            yield progress
+            self._write(username, progress)
+
+    def load(self, username):
+        path = self._path(username)
+        if self.legacy_progress is not None and not os.path.exists(path):
+            with self._update(username) as progress:
+                if not os.path.exists(path):  # Not created by another process while we waited
+                    self._apply(progress, self.legacy_progress)
+        with self.lock:
+            return self._read(username)
+
+    def add_completed_lesson(self, username, lesson):
+        with self._update(username) as progress:
+            if lesson not in progress["completed_lessons"]:
+                progress["completed_lessons"].append(lesson)
+
+    def set_quiz_score(self, username, quiz, score):
+        with self._update(username) as progress:
+            progress["quiz_scores"][quiz] = score
+
+    def set_streak(self, username, streak_count, last_learning_time):
+        with self._update(username) as progress:
+            progress["streak_count"] = streak_count
+            progress["last_learning_time"] = last_learning_time
+
+    def add_badge(self, username, badge):
+        with self._update(username) as progress:
+            if badge not in progress["badges"]:
+                progress["badges"].append(badge)
+
+    def set_learning_goal(self, username, goal):
+        with self._update(username) as progress:
+            progress["learning_goal"] = goal
+
+    def _add_history(self, progress, history):
+        for qid, (attempts, correct) in history.items():
+            current = progress["question_history"].setdefault(qid, [0, 0])
+            current[0] += attempts
+            current[1] += correct
+
+    def record_answers(self, username, history):
+        with self._update(username) as progress:
+            self._add_history(progress, history)
+
+    def set_review_cards(self, username, cards):
+        with self._update(username) as progress:
+            progress["review_cards"].update(cards)
+
+    def _apply(self, progress, changes):
+        for lesson in changes.get("completed_lessons", []):
+            if lesson not in progress["completed_lessons"]:
+                progress["completed_lessons"].append(lesson)
+        progress["quiz_scores"].update(changes.get("quiz_scores", {}))
+        if "streak" in changes:
+            progress["streak_count"], progress["last_learning_time"] = changes["streak"]
+        for badge in changes.get("badges", []):
+            if badge not in progress["badges"]:
+                progress["badges"].append(badge)
+        if "learning_goal" in changes:
+            progress["learning_goal"] = changes["learning_goal"]
+        self._add_history(progress, changes.get("question_history", {}))
+        progress["review_cards"].update(changes.get("review_cards", {}))
+
+    def apply(self, username, changes):
+        with self._update(username) as progress:
+            self._apply(progress, changes)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    last_learning_time TEXT NOT NULL,
+    streak_count INTEGER NOT NULL,
+    learning_goal TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS completed_lessons (
+    username TEXT NOT NULL,
+    lesson TEXT NOT NULL,
+    completed_at TEXT NOT NULL,
+    PRIMARY KEY (username, lesson)
+);
+CREATE TABLE IF NOT EXISTS quiz_scores (
+    username TEXT NOT NULL,
+    quiz TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (username, quiz)
+);
+CREATE TABLE IF NOT EXISTS question_history (
+    username TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (username, question_id)
+);
+CREATE TABLE IF NOT EXISTS review_cards (
+    username TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    easiness REAL NOT NULL,
+    interval REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (username, question_id)
+);
+CREATE INDEX IF NOT EXISTS review_cards_due ON review_cards (username, due);
+CREATE TABLE IF NOT EXISTS badges (
+    username TEXT NOT NULL,
+    badge TEXT NOT NULL,
+    earned_at TEXT NOT NULL,
+    PRIMARY KEY (username, badge)
+);
+"""
+
+
+class SqliteProgressBackend(ProgressBackend):
+    """
+    SQLite backend in WAL mode, so readers never block the writer.
+    Connections come from a fixed-size pool shared by every session in the process.
+    """
+
+    def __init__(self, db_path=PROGRESS_DB, pool_size=8, timeout=30.0):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pool = queue.Queue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self.pool.put(self._connect(timeout))
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self, timeout):
+        conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    @contextmanager
+    def _transaction(self, username):
+        """Write transaction that makes sure the user row exists first."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure_user(conn, username)
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _ensure_user(self, conn, username):
+        defaults = default_progress()
+        conn.execute(
+            "INSERT OR IGNORE INTO users (username, last_learning_time, streak_count) VALUES (?, ?, ?)",
+            (username, defaults["last_learning_time"], defaults["streak_count"])
+        )
+
+    def _read(self, conn, username):
+        user = conn.execute(
+            "SELECT last_learning_time, streak_count, learning_goal FROM users WHERE username = ?",
+            (username,)
+        ).fetchone()
+        if user is None:
+            return None
+        last_learning_time, streak_count, learning_goal = user
+        completed = conn.execute(
+            "SELECT lesson FROM completed_lessons WHERE username = ? ORDER BY rowid", (username,)
+        ).fetchall()
+        scores = conn.execute(
+            "SELECT quiz, score FROM quiz_scores WHERE username = ? ORDER BY rowid", (username,)
+        ).fetchall()
+        badges = conn.execute(
+            "SELECT badge FROM badges WHERE username = ? ORDER BY rowid", (username,)
+        ).fetchall()
+        history = conn.execute(
+            "SELECT question_id, attempts, correct FROM question_history WHERE username = ?", (username,)
+        ).fetchall()
+        cards = conn.execute(
+            "SELECT question_id, easiness, interval, repetitions, due FROM review_cards WHERE username = ?",
+            (username,)
+        ).fetchall()
+        return {
+            "completed_lessons": [row[0] for row in completed],
+            "quiz_scores": dict(scores),
+            "last_learning_time": last_learning_time,
+            "streak_count": streak_count,
+            "badges": [row[0] for row in badges],
+            "learning_goal": json.loads(learning_goal),
+            "question_history": {qid: [attempts, correct] for qid, attempts, correct in history},
+            "review_cards": {qid: list(card) for qid, *card in cards}
+        }
+
+    def load(self, username):
+        # Plain reads run against a WAL snapshot; only first-time users take the write lock
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                progress = self._read(conn, username)
+            finally:
+                conn.execute("COMMIT")
+        if progress is None:
+            with self._transaction(username) as conn:
+                if self.legacy_progress is not None:
+                    self._apply(conn, username, self.legacy_progress)
+                progress = self._read(conn, username)
+        return progress
+
+    def _add_completed_lesson(self, conn, username, lesson):
+        conn.execute(
+            "INSERT OR IGNORE INTO completed_lessons (username, lesson, completed_at) VALUES (?, ?, ?)",
+            (username, lesson, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+
+    def _set_quiz_score(self, conn, username, quiz, score):
+        conn.execute(
+            "INSERT INTO quiz_scores (username, quiz, score) VALUES (?, ?, ?) "
+            "ON CONFLICT (username, quiz) DO UPDATE SET score = excluded.score",
+            (username, quiz, score)
+        )
+
+    def _set_streak(self, conn, username, streak_count, last_learning_time):
+        conn.execute(
+            "UPDATE users SET streak_count = ?, last_learning_time = ? WHERE username = ?",
+            (streak_count, last_learning_time, username)
+        )
+
+    def _add_badge(self, conn, username, badge):
+        conn.execute(
+            "INSERT OR IGNORE INTO badges (username, badge, earned_at) VALUES (?, ?, ?)",
+            (username, badge, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+
+    def _set_learning_goal(self, conn, username, goal):
+        conn.execute(
+            "UPDATE users SET learning_goal = ? WHERE username = ?",
+            (json.dumps(goal), username)
+        )
+
+    def _record_answers(self, conn, username, history):
+        conn.executemany(
+            "INSERT INTO question_history (username, question_id, attempts, correct) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (username, question_id) DO UPDATE SET "
+            "attempts = attempts + excluded.attempts, correct = correct + excluded.correct",
+            [(username, qid, attempts, correct) for qid, (attempts, correct) in history.items()]
+        )
+
+    def _set_review_cards(self, conn, username, cards):
+        conn.executemany(
+            "INSERT OR REPLACE INTO review_cards (username, question_id, easiness, interval, repetitions, due) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(username, qid, *card) for qid, card in cards.items()]
+        )
+
+    def add_completed_lesson(self, username, lesson):
+        with self._transaction(username) as conn:
+            self._add_completed_lesson(conn, username, lesson)
+
+    def set_quiz_score(self, username, quiz, score):
+        with self._transaction(username) as conn:
+            self._set_quiz_score(conn, username, quiz, score)
+
+    def set_streak(self, username, streak_count, last_learning_time):
+        with self._transaction(username) as conn:
+            self._set_streak(conn, username, streak_count, last_learning_time)
+
+    def add_badge(self, username, badge):
+        with self._transaction(username) as conn:
+            self._add_badge(conn, username, badge)
+
+    def set_learning_goal(self, username, goal):
+        with self._transaction(username) as conn:
+            self._set_learning_goal(conn, username, goal)
+
+    def record_answers(self, username, history):
+        with self._transaction(username) as conn:
+            self._record_answers(conn, username, history)
+
+    def set_review_cards(self, username, cards):
+        with self._transaction(username) as conn:
+            self._set_review_cards(conn, username, cards)
+
+    def _apply(self, conn, username, changes):
+        for lesson in changes.get("completed_lessons", []):
+            self._add_completed_lesson(conn, username, lesson)
+        for quiz, score in changes.get("quiz_scores", {}).items():
+            self._set_quiz_score(conn, username, quiz, score)
+        if "streak" in changes:
+            self._set_streak(conn, username, *changes["streak"])
+        for badge in changes.get("badges", []):
+            self._add_badge(conn, username, badge)
+        if "learning_goal" in changes:
+            self._set_learning_goal(conn, username, changes["learning_goal"])
+        if "question_history" in changes:
+            self._record_answers(conn, username, changes["question_history"])
+        if "review_cards" in changes:
+            self._set_review_cards(conn, username, changes["review_cards"])
+
+    def apply(self, username, changes):
+        with self._transaction(username) as conn:
+            self._apply(conn, username, changes)
+
+    def close(self):
+        while not self.pool.empty():
+            self.pool.get().close()
+
+
+# Process-wide I/O counters, summed over every ProgressSession
+write_counters = {"performed": 0, "avoided": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(performed=0, avoided=0):
+    with _counters_lock:
+        write_counters["performed"] += performed
+        write_counters["avoided"] += avoided
+
+
+def get_write_counters():
+    """Snapshot of writes performed vs. avoided since the process started."""
+    with _counters_lock:
+        return dict(write_counters)
+
+
+class ProgressSession:
+    """
+    Write-behind view of one user's progress for a single script run.
+    Mutations update the in-memory record immediately and are remembered as
+    pending changes; flush() sends them to the backend in one write, and does
+    nothing at all when no field actually changed.
+    """
+
+    def __init__(self, backend, username):
+        self.backend = backend
+        self.username = username
+        self.progress = backend.load(username)
+        self.changes = {}
+        self.mutations = 0
+
+    @property
+    def dirty(self):
+        """Names of the fields changed since the last flush."""
+        return set(self.changes)
+
+    def complete_lesson(self, lesson):
+        self.mutations += 1
+        if lesson in self.progress["completed_lessons"]:
+            return False
+        self.progress["completed_lessons"].append(lesson)
+        self.changes.setdefault("completed_lessons", []).append(lesson)
+        return True
+
+    def set_quiz_score(self, quiz, score):
+        self.mutations += 1
+        if self.progress["quiz_scores"].get(quiz) == score:
+            return
+        self.progress["quiz_scores"][quiz] = score
+        self.changes.setdefault("quiz_scores", {})[quiz] = score
+
+    def set_streak(self, streak_count, last_learning_time):
+        self.mutations += 1
+        if (self.progress["streak_count"], self.progress["last_learning_time"]) == (streak_count, last_learning_time):
+            return
+        self.progress["streak_count"] = streak_count
+        self.progress["last_learning_time"] = last_learning_time
+        self.changes["streak"] = (streak_count, last_learning_time)
+
+    def add_badge(self, badge):
+        self.mutations += 1
+        if badge in self.progress["badges"]:
+            return False
+        self.progress["badges"].append(badge)
+        self.changes.setdefault("badges", []).append(badge)
+        return True
+
+    def set_learning_goal(self, goal):
+        self.mutations += 1
+        if self.progress["learning_goal"] == goal:
+            return
+        self.progress["learning_goal"] = goal
+        self.changes["learning_goal"] = goal
+
+    def record_answer(self, question_id, correct):
+        """Counts one answer to a question (history is stored as [attempts, correct])."""
+        self.mutations += 1
+        history = self.progress["question_history"].setdefault(question_id, [0, 0])
+        history[0] += 1
+        history[1] += int(correct)
+        pending = self.changes.setdefault("question_history", {}).setdefault(question_id, [0, 0])
+        pending[0] += 1
+        pending[1] += int(correct)
+
+    def set_review_card(self, question_id, card):
+        """Stores a question's spaced-repetition state (any sequence of easiness, interval, repetitions, due)."""
+        self.mutations += 1
+        card = list(card)
+        self.progress["review_cards"][question_id] = card
+        self.changes.setdefault("review_cards", {})[question_id] = card
+
+    def flush(self):
+        """Writes all pending changes at once; returns True if a write happened."""
+        if not self.changes:
+            _count(avoided=self.mutations)
+            self.mutations = 0
+            return False
+        self.backend.apply(self.username, self.changes)
+        _count(performed=1, avoided=self.mutations - 1)
+        self.changes = {}
+        self.mutations = 0
+        return True
+
+
+def get_progress_backend(kind=PROGRESS_BACKEND, legacy_file=LEGACY_PROGRESS_FILE):
+    """Builds the configured backend ("sqlite" or "json"), importing the pre-upgrade progress file if there is one."""
+    if kind == "sqlite":
+        backend = SqliteProgressBackend()
+    elif kind == "json":
+        backend = JsonProgressBackend()
+    else:
+        raise ValueError(f"Unknown progress backend: {kind}")
+    backend.legacy_progress = load_legacy_progress(legacy_file)
+    return backend
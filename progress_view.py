@@ -0,0 +1,58 @@
+from collections import namedtuple
+from datetime import date, datetime
+
+# Everything the Progress page shows, derived once from a progress record.
+# `key` identifies the record (and day) it was built from.
+ProgressView = namedtuple("ProgressView", [
+    "key",
+    "goal_description", "deadline", "remaining_lessons", "days_left", "behind_schedule",
+    "streak_count", "badges",
+    "quiz_scores", "average_score", "best_score",
+])
+
+
+def progress_key(progress, today=None):
+    """Identifies the parts of a progress record the view depends on (plus the day, for days_left)."""
+    goal = progress.get("learning_goal") or {}
+    return (
+        today or date.today(),
+        tuple(progress["completed_lessons"]),
+        tuple(progress["badges"]),
+        tuple(progress["quiz_scores"].items()),
+        progress["streak_count"],
+        goal.get("goal_description"), goal.get("end_date"), tuple(goal.get("lesson_plan", ())),
+    )
+
+
+def build_progress_view(progress, key=None):
+    key = key or progress_key(progress)
+    goal = progress.get("learning_goal") or {}
+    remaining, days_left = (), None
+    if goal:
+        completed = set(progress["completed_lessons"])
+        remaining = tuple(lesson for lesson in goal["lesson_plan"] if lesson not in completed)
+        days_left = (datetime.combine(date.fromisoformat(goal["end_date"]), datetime.min.time()) - datetime.now()).days
+
+    scores = tuple(progress["quiz_scores"].items())
+    values = [score for _, score in scores]
+    return ProgressView(
+        key=key,
+        goal_description=goal.get("goal_description"),
+        deadline=goal.get("end_date"),
+        remaining_lessons=remaining,
+        days_left=days_left,
+        behind_schedule=days_left is not None and days_left < len(remaining),
+        streak_count=progress["streak_count"],
+        badges=tuple(progress["badges"]),
+        quiz_scores=scores,
+        average_score=sum(values) / len(values) if values else None,
+        best_score=max(values) if values else None,
+    )
+
+
+def progress_view(progress, previous=None):
+    """The view for this record, reusing `previous` unless the record (or the day) changed."""
+    key = progress_key(progress)
+    if previous is not None and previous.key == key:
+        return previous
+    return build_progress_view(progress, key)
@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from content_store import MASTER_QUIZZES_FILE, normalize_question, normalize_text, topic_for_title
+from master_store import INDEX_SUFFIX, encode_item, locked, read_master
+
+# MinHash signature length and LSH banding: 16 bands of 4 rows make pairs with
+# Jaccard similarity around 0.5 and up likely to share a bucket
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Generated questions are often numbered ("Question 12: ..."); quoting and brackets vary between runs
+QUESTION_NUMBER = re.compile(r"^question\s*\d+\s*[:.)-]\s*")
+QUOTING = re.compile(r"[`'\"()\[\]]")
+
+# Jaccard similarity of shingles at which two questions (with the same answer) are near-duplicates;
+# LSH only proposes candidates, each one is checked against its exact shingle set
+NEAR_DUP_THRESHOLD = 0.7
+
+DEDUP_REPORT_FILE = os.path.join("user_data", "quiz_dedup_report.json")
+
+_PRIME = (1 << 31) - 1
+_random = np.random.RandomState(1)
+_A = _random.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _random.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+def exact_key(question):
+    """Content address of a question: normalized text plus its sorted, normalized options."""
+    options = sorted(normalize_text(option) for option in question["options"])
+    key = normalize_text(question["question"]) + "\x1f" + "\x1f".join(options)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def shingles(text):
+    """
+    Word bigrams of the question, with operators and literals as their own tokens,
+    so "true && false" and "false && false" stay apart while rewordings overlap.
+    """
+    text = QUOTING.sub(" ", QUESTION_NUMBER.sub("", normalize_text(text)))
+    tokens = re.findall(r"\w+|[^\w\s]+", text)
+    if len(tokens) < 2:
+        return {" ".join(tokens)}
+    return {tokens[i] + " " + tokens[i + 1] for i in range(len(tokens) - 1)}
+
+
+def minhash(shingle_set):
+    """NUM_PERM-value MinHash signature of a shingle set."""
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingle_set], dtype=np.uint64)
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0)
+
+
+class QuestionDeduplicator:
+    """
+    Streams questions through two checks: an exact content hash, then MinHash/LSH
+    for lightly reworded copies. Each question is compared only against the
+    candidates that share an LSH bucket (same topic), so a whole bank is
+    deduplicated in roughly linear time. The first question seen in a cluster is
+    kept; the rest are merged into it and listed in clusters().
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}
+        self.buckets = {}
+        self.kept = []
+        self.shingles = []
+        self.merged = {}
+        self.counts = {"kept": 0, "exact": 0, "near": 0}
+
+    def check(self, question, topic):
+        """
+        Returns (kind, representative) for a normalized question: kind is None
+        for a new question, else "exact" or "near".
+        """
+        key = exact_key(question)
+        if key in self.exact:
+            return "exact", self.exact[key]
+        shingle_set = shingles(question["question"])
+        signature = minhash(shingle_set)
+        answer = normalize_text(question["answer"])
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self.buckets.get((topic, band, signature[band * ROWS:(band + 1) * ROWS].tobytes()), ()))
+        best, best_similarity = None, self.threshold
+        for i in sorted(candidates):
+            if normalize_text(self.kept[i]["answer"]) != answer:
+                continue
+            kept = self.shingles[i]
+            similarity = len(kept & shingle_set) / len(kept | shingle_set)
+            if similarity >= best_similarity:
+                best, best_similarity = i, similarity
+        if best is not None:
+            return "near", best
+        return None, (key, shingle_set, signature)
+
+    def add(self, question, topic):
+        """Keeps a new question or merges it into an existing cluster; returns True if it was kept."""
+        normalized = normalize_question(question)
+        if normalized is None:
+            return True  # Not a renderable question; ContentStore reports it as invalid
+        kind, found = self.check(normalized, topic)
+        if kind is not None:
+            self.counts[kind] += 1
+            self.merged.setdefault(found, []).append((kind, question))
+            return False
+        key, shingle_set, signature = found
+        i = len(self.kept)
+        self.exact[key] = i
+        self.kept.append(normalized)
+        self.shingles.append(shingle_set)
+        for band in range(BANDS):
+            bucket = (topic, band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            self.buckets.setdefault(bucket, []).append(i)
+        self.counts["kept"] += 1
+        return True
+
+    def filter(self, questions, topic):
+        """The questions of one generated quiz that aren't duplicates of anything seen so far."""
+        return [question for question in questions if self.add(question, topic)]
+
+    def clusters(self):
+        """Merged clusters, largest first: the kept question and the duplicates folded into it."""
+        clusters = [
+            {
+                "kept": self.kept[i]["question"],
+                "merged": [{"kind": kind, "question": question["question"]} for kind, question in merged]
+            }
+            for i, merged in self.merged.items()
+        ]
+        clusters.sort(key=lambda cluster: -len(cluster["merged"]))
+        return clusters
+
+
+def dedup_from_master(quizzes_file=MASTER_QUIZZES_FILE):
+    """A deduplicator that has seen every question already in the master (for inline use)."""
+    dedup = QuestionDeduplicator()
+    for quiz in read_master(quizzes_file):
+        dedup.filter(quiz.get("questions", []), topic_for_title(quiz.get("title")))
+    return dedup
+
+
+def dedup_master(quizzes_file=MASTER_QUIZZES_FILE, apply=False):
+    """
+    Batch job over the whole master in one streaming pass. With apply=True the
+    master is rewritten without the merged questions (quizzes left empty are
+    dropped). Returns the deduplicator, for its counts and clusters.
+    """
+    dedup = QuestionDeduplicator()
+    if not apply:
+        for quiz in read_master(quizzes_file):
+            dedup.filter(quiz.get("questions", []), topic_for_title(quiz.get("title")))
+        return dedup
+
+    # Appends wait for the rewrite (and then go to the new file) instead of being lost with the old one
+    with locked(quizzes_file):
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(quizzes_file) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for quiz in read_master(quizzes_file):
+                    questions = dedup.filter(quiz.get("questions", []), topic_for_title(quiz.get("title")))
+                    if questions:
+                        out.write(encode_item(dict(quiz, questions=questions)))
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(tmp_file, 0o644)
+            if os.path.exists(quizzes_file + INDEX_SUFFIX):
+                os.remove(quizzes_file + INDEX_SUFFIX)  # Rebuilt on next open
+            os.replace(tmp_file, quizzes_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+    return dedup
+
+
+def save_report(dedup, path=DEDUP_REPORT_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"counts": dedup.counts, "clusters": dedup.clusters()}, f, indent=4)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find exact and near-duplicate quiz questions.")
+    parser.add_argument("--quizzes", default=MASTER_QUIZZES_FILE)
+    parser.add_argument("--apply", action="store_true", help="rewrite the master without the duplicates")
+    parser.add_argument("--report", default=DEDUP_REPORT_FILE, help="where to write the cluster report")
+    parser.add_argument("--show", type=int, default=10, help="clusters to print")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dedup = dedup_master(args.quizzes, apply=args.apply)
+    counts = dedup.counts
+    print(f"{sum(counts.values())} questions in {time.perf_counter() - start:.2f}s: kept {counts['kept']}, "
+          f"merged {counts['exact']} exact and {counts['near']} near duplicates"
+          + (" (master rewritten)" if args.apply else " (dry run)"))
+    for cluster in dedup.clusters()[:args.show]:
+        print(f"\n  kept: {cluster['kept']}")
+        for merged in cluster["merged"]:
+            print(f"    {merged['kind']:>5}: {merged['question']}")
+    save_report(dedup, args.report)
+    print(f"\nReport with all {len(dedup.merged)} clusters -> {args.report}")
@@ -0,0 +1,130 @@
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from attempt_log import AttemptLog
+from content_store import TOPICS
+
+ANALYTICS_FILE = os.path.join("user_data", "quiz_analytics.json")
+
+# Questions need this many attempts before their statistics are reported
+MIN_ATTEMPTS = 5
+
+
+def question_stats(question, correct, user_accuracy_per_attempt, n_questions):
+    """
+    Per-question attempts, proportion correct and discrimination.
+    Discrimination is the point-biserial correlation between answering the
+    question correctly and the learner's overall accuracy, computed for all
+    questions at once from bincount sums.
+    """
+    x = correct.astype(np.float64)
+    y = user_accuracy_per_attempt
+    n = np.bincount(question, minlength=n_questions).astype(np.float64)
+    sum_x = np.bincount(question, weights=x, minlength=n_questions)
+    sum_y = np.bincount(question, weights=y, minlength=n_questions)
+    sum_xy = np.bincount(question, weights=x * y, minlength=n_questions)
+    sum_yy = np.bincount(question, weights=y * y, minlength=n_questions)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_correct = sum_x / n
+        covariance = sum_xy / n - p_correct * (sum_y / n)
+        var_x = p_correct * (1 - p_correct)  # x is 0/1
+        var_y = sum_yy / n - (sum_y / n) ** 2
+        discrimination = covariance / np.sqrt(var_x * var_y)
+    return n, p_correct, np.nan_to_num(discrimination)
+
+
+def learner_mastery(user, topic, correct, n_users):
+    """Smoothed accuracy per (learner, topic): (correct + 1) / (attempts + 2)."""
+    key = user.astype(np.int64) * len(TOPICS) + topic
+    size = n_users * len(TOPICS)
+    attempts = np.bincount(key, minlength=size).reshape(n_users, len(TOPICS))
+    right = np.bincount(key, weights=correct, minlength=size).reshape(n_users, len(TOPICS))
+    return attempts, (right + 1) / (attempts + 2)
+
+
+def compute(columns, n_users, n_questions):
+    """Runs every analysis over the attempt columns and returns plain arrays."""
+    user = columns["user"].astype(np.int64)
+    question = columns["question"].astype(np.int64)
+    correct = columns["correct"].astype(np.float64)
+
+    user_attempts = np.bincount(user, minlength=n_users)
+    user_correct = np.bincount(user, weights=correct, minlength=n_users)
+    user_accuracy = np.divide(user_correct, user_attempts, out=np.zeros(n_users), where=user_attempts > 0)
+
+    attempts, p_correct, discrimination = question_stats(question, correct, user_accuracy[user], n_questions)
+    mastery_attempts, mastery = learner_mastery(user, columns["topic"], correct, n_users)
+    return {
+        "question_attempts": attempts,
+        "p_correct": p_correct,
+        "discrimination": discrimination,
+        "mastery_attempts": mastery_attempts,
+        "mastery": mastery,
+    }
+
+
+def build_report(log):
+    """Computes analytics for the whole attempt log as a JSON-serializable dict."""
+    start = time.perf_counter()
+    columns = log.columns()
+    results = compute(columns, len(log.users.values), len(log.questions.values))
+
+    questions = {}
+    for code, qid in enumerate(log.questions.values):
+        attempts = int(results["question_attempts"][code])
+        if attempts < MIN_ATTEMPTS:
+            continue
+        p = float(results["p_correct"][code])
+        smoothed = (p * attempts + 1) / (attempts + 2)
+        questions[qid] = {
+            "attempts": attempts,
+            "p_correct": round(p, 4),
+            # Logit difficulty, the scale adaptive_quiz uses
+            "difficulty": round(math.log((1 - smoothed) / smoothed), 4),
+            "discrimination": round(float(results["discrimination"][code]), 4),
+        }
+
+    mastery = {}
+    for code, username in enumerate(log.users.values):
+        mastery[username] = {
+            topic: round(float(results["mastery"][code, t]), 4)
+            for t, topic in enumerate(TOPICS)
+            if results["mastery_attempts"][code, t] > 0
+        }
+
+    return {
+        "generated_at": time.time(),
+        "attempts": int(len(columns["user"])),
+        "compute_seconds": round(time.perf_counter() - start, 3),
+        "questions": questions,
+        "mastery": mastery,
+    }
+
+
+def save_report(report, path=ANALYTICS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def load_report(path=ANALYTICS_FILE):
+    """Precomputed analytics, or None if they haven't been built yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    report = build_report(AttemptLog())
+    save_report(report)
+    print(f"Analysed {report['attempts']} attempts in {report['compute_seconds']}s -> {ANALYTICS_FILE}")
@@ -0,0 +1,155 @@
+import mmap
+import os
+import struct
+import tempfile
+
+from content_store import MASTER_QUIZZES_FILE, TOPICS, ContentStore
+
+# Compiled quiz bank, shared read-only by every app process through mmap
+QUIZ_BANK_FILE = os.path.splitext(MASTER_QUIZZES_FILE)[0] + ".bin"
+
+# File layout (all integers little-endian):
+#   header    magic, version, topic count, question count, string count
+#   topics    per topic: name string index, first question index, question count
+#   questions per question: 12-byte ID, question/answer/first-option string index, option count
+#   offsets   string count + 1 offsets into the string blob
+#   blob      packed UTF-8 strings
+MAGIC = b"QBNK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+TOPIC_RECORD = struct.Struct("<III")
+QUESTION_RECORD = struct.Struct("<12sIIIH")
+OFFSET = struct.Struct("<I")
+
+
+def compile_quiz_bank(quizzes_file=MASTER_QUIZZES_FILE, out_file=QUIZ_BANK_FILE):
+    """Compiles the (deduplicated) quiz master file into the binary quiz bank."""
+    store = ContentStore(lessons_file=None, quizzes_file=quizzes_file)
+    strings = []
+    topic_records = []
+    question_records = []
+
+    def add_string(text):
+        strings.append(text.encode("utf-8"))
+        return len(strings) - 1
+
+    for topic in TOPICS:
+        pool = store.question_pool(topic)
+        topic_records.append((add_string(topic), len(question_records), len(pool)))
+        for question in pool:
+            question_index = add_string(question["question"])
+            answer_index = add_string(question["answer"])
+            first_option = len(strings)
+            for option in question["options"]:
+                add_string(option)
+            question_records.append((question["id"].encode("ascii"), question_index, answer_index,
+                                     first_option, len(question["options"])))
+
+    offsets = [0]
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+
+    # Write to a temp file and rename so readers never map a half-written bank;
+    # each builder gets its own temp file, so concurrent rebuilds don't collide
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(out_file) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(topic_records), len(question_records), len(strings)))
+        for record in topic_records:
+            f.write(TOPIC_RECORD.pack(*record))
+        for record in question_records:
+            f.write(QUESTION_RECORD.pack(*record))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        for data in strings:
+            f.write(data)
+    os.chmod(tmp_file, 0o644)
+    os.replace(tmp_file, out_file)
+    return out_file
+
+
+def ensure_quiz_bank(quizzes_file=MASTER_QUIZZES_FILE, bank_file=QUIZ_BANK_FILE):
+    """Recompiles the bank if it is missing or older than the master file."""
+    if (not os.path.exists(bank_file)
+            or os.path.getmtime(bank_file) < os.path.getmtime(quizzes_file)):
+        compile_quiz_bank(quizzes_file, bank_file)
+    return bank_file
+
+
+class QuestionPool:
+    """Sequence view over one topic's questions; items are decoded on access."""
+
+    def __init__(self, bank, start, count):
+        self.bank = bank
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.bank.question(self.start + i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("question index out of range")
+        return self.bank.question(self.start + index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.bank.question(self.start + i)
+
+
+class QuizBank:
+    """
+    Read-only, memory-mapped view of a compiled quiz bank.
+    Only the fixed-size tables are touched when opening; question strings are
+    decoded from the shared pages when a question is requested.
+    """
+
+    def __init__(self, bank_file=QUIZ_BANK_FILE):
+        with open(bank_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_topics, n_questions, n_strings = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{bank_file} is not a version {VERSION} quiz bank")
+
+        self.n_questions = n_questions
+        self._questions_at = HEADER.size + n_topics * TOPIC_RECORD.size
+        self._offsets_at = self._questions_at + n_questions * QUESTION_RECORD.size
+        self._blob_at = self._offsets_at + (n_strings + 1) * OFFSET.size
+
+        self.topics = {}
+        for i in range(n_topics):
+            name_index, first, count = TOPIC_RECORD.unpack_from(self._mm, HEADER.size + i * TOPIC_RECORD.size)
+            self.topics[self._string(name_index)] = (first, count)
+
+    def _string(self, index):
+        start, end = struct.unpack_from("<II", self._mm, self._offsets_at + index * OFFSET.size)
+        return str(self._mm[self._blob_at + start:self._blob_at + end], "utf-8")
+
+    def __len__(self):
+        return self.n_questions
+
+    def question(self, index):
+        """Decodes question number `index` into the dict shape used by app.py."""
+        qid, question_index, answer_index, first_option, n_options = QUESTION_RECORD.unpack_from(
+            self._mm, self._questions_at + index * QUESTION_RECORD.size)
+        return {
+            "id": qid.decode("ascii"),
+            "question": self._string(question_index),
+            "options": [self._string(first_option + i) for i in range(n_options)],
+            "answer": self._string(answer_index)
+        }
+
+    def question_pool(self, topic):
+        first, count = self.topics.get(topic, (0, 0))
+        return QuestionPool(self, first, count)
+
+    def close(self):
+        self._mm.close()
+
+
+if __name__ == "__main__":
+    path = compile_quiz_bank()
+    print(f"Compiled {len(QuizBank(path))} questions into {path} ({os.path.getsize(path)} bytes)")
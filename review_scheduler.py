@@ -0,0 +1,160 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+# SM-2 review state of one question for one learner; `due` is a Unix timestamp
+Card = namedtuple("Card", ["easiness", "interval", "repetitions", "due"])
+
+DAY = 24 * 60 * 60
+INITIAL_EASINESS = 2.5
+MIN_EASINESS = 1.3
+
+# Quiz answers are right or wrong, so they map onto two SM-2 grades (0-5)
+CORRECT_QUALITY = 4
+INCORRECT_QUALITY = 1
+
+# A missed question comes back after this long rather than a full day
+RELEARN_DELAY = 10 * 60
+
+
+def review(card, correct, now=None):
+    """Returns the card after one answer, following SM-2."""
+    now = time.time() if now is None else now
+    quality = CORRECT_QUALITY if correct else INCORRECT_QUALITY
+    if card is None:
+        card = Card(INITIAL_EASINESS, 0.0, 0, now)
+
+    easiness = card.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    easiness = max(MIN_EASINESS, easiness)
+    if quality < 3:
+        return Card(easiness, 0.0, 0, now + RELEARN_DELAY)
+
+    repetitions = card.repetitions + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = card.interval * easiness
+    return Card(easiness, interval, repetitions, now + interval * DAY)
+
+
+class ReviewQueue:
+    """
+    One learner's cards in a min-heap keyed by due date.
+    Rescheduling pushes a new entry instead of searching the heap; entries that
+    no longer match the card's due date are discarded when they reach the top.
+    """
+
+    def __init__(self, cards=None):
+        self.cards = dict(cards or {})
+        self.removed = set()
+        self.heap = [(card.due, qid) for qid, card in self.cards.items()]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def schedule(self, question_id, card):
+        self.cards[question_id] = card
+        heapq.heappush(self.heap, (card.due, question_id))
+
+    def remove(self, question_id):
+        """Drops a card; its heap entries are discarded lazily like stale ones."""
+        self.cards.pop(question_id, None)
+        self.removed.add(question_id)
+
+    def sync(self, stored_cards):
+        """Takes every stored card that differs from the queue's (e.g. written by another app process)."""
+        for qid, card in stored_cards.items():
+            if qid not in self.removed and self.cards.get(qid) != tuple(card):
+                self.schedule(qid, Card(*card))
+
+    def _drop_stale(self):
+        while self.heap:
+            due, qid = self.heap[0]
+            card = self.cards.get(qid)
+            if card is not None and card.due == due:
+                return
+            heapq.heappop(self.heap)
+
+    def next_due(self):
+        """Due date of the earliest card, or None when there are no cards."""
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def due(self, now=None, limit=None):
+        """Question IDs due at `now`, earliest first: O(k log n) for k results."""
+        now = time.time() if now is None else now
+        popped = []
+        result = []
+        self._drop_stale()
+        while self.heap and self.heap[0][0] <= now and (limit is None or len(result) < limit):
+            entry = heapq.heappop(self.heap)
+            popped.append(entry)
+            result.append(entry[1])
+            self._drop_stale()
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+        return result
+
+    def compact(self):
+        """Rebuilds the heap without stale entries once they outnumber live ones."""
+        if len(self.heap) > 2 * len(self.cards):
+            self.heap = [(card.due, qid) for qid, card in self.cards.items()]
+            heapq.heapify(self.heap)
+
+
+class ReviewIndex:
+    """
+    Process-wide index of every learner's review queue.
+    Queues are built on first use from the cards stored with the learner's
+    progress and then kept up to date incrementally after each answer. Other
+    app processes may answer for the same learner, so pass the freshly loaded
+    cards to queue() on each run: cards that changed elsewhere are rescheduled.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.lock = threading.Lock()
+
+    def queue(self, username, stored_cards=None):
+        with self.lock:
+            queue = self.queues.get(username)
+            if queue is None:
+                cards = {qid: Card(*card) for qid, card in (stored_cards or {}).items()}
+                queue = self.queues[username] = ReviewQueue(cards)
+            elif stored_cards:
+                queue.sync(stored_cards)
+            return queue
+
+    def record(self, username, question_id, correct, now=None, stored_card=None):
+        """
+        Reschedules one question after an answer and returns the new card.
+        `stored_card` is the learner's persisted card, which wins over the queue's copy.
+        """
+        queue = self.queue(username)
+        with self.lock:
+            card = queue.cards.get(question_id) if stored_card is None else Card(*stored_card)
+            card = review(card, correct, now)
+            queue.schedule(question_id, card)
+            queue.compact()
+        return card
+
+    def forget(self, username, question_ids):
+        """Removes cards whose questions are no longer in the bank."""
+        queue = self.queue(username)
+        with self.lock:
+            for question_id in question_ids:
+                queue.remove(question_id)
+
+    def due(self, username, now=None, limit=None):
+        queue = self.queue(username)
+        with self.lock:
+            return queue.due(now, limit)
+
+    def next_due(self, username):
+        queue = self.queue(username)
+        with self.lock:
+            return queue.next_due()
@@ -0,0 +1,359 @@
+import bisect
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from content_store import (BASE_DIR, MASTER_LESSONS_FILE, MASTER_QUIZZES_FILE, TOPICS, ContentStore,
+                           _flatten, lesson_id, normalize_text)
+
+# Prebuilt search index, shared read-only by every app process through mmap
+SEARCH_INDEX_FILE = os.path.join(BASE_DIR, "search_index.bin")
+
+# File layout (all integers little-endian, sections 8-byte aligned):
+#   header    magic, version, doc/term/posting/delete/string counts
+#   docs      per doc: kind, topic index, reference/title/snippet string index
+#             (the reference is content_store's lesson_id or question id)
+#   terms     per term (sorted): string index, first posting, posting count
+#   postings  doc numbers (uint32), then precomputed BM25 impacts (float32)
+#   deletes   sorted 64-bit hashes of every term and its one-character deletions, then their term numbers
+#   offsets   string count + 1 offsets into the string blob
+#   blob      packed UTF-8 strings
+MAGIC = b"SIDX"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxIIIII")
+DOC_DTYPE = np.dtype([("kind", "u1"), ("topic", "u1"), ("pad", "V2"),
+                      ("reference", "<u4"), ("title", "<u4"), ("snippet", "<u4")])
+TERM_DTYPE = np.dtype([("string", "<u4"), ("start", "<u4"), ("count", "<u4")])
+OFFSET = struct.Struct("<I")
+
+LESSON, QUESTION = 0, 1
+
+# Field weights: a match in a title counts three times a match in body text
+TITLE_WEIGHT = 3
+CONCEPT_WEIGHT = 2
+BODY_WEIGHT = 1
+LESSON_BODY_FIELDS = ["overview", "description", "lessonDescription", "content", "sections", "modules"]
+LESSON_CONCEPT_FIELDS = ["key_concepts", "keywords"]
+
+# BM25 parameters and how much looser matches count
+K1 = 1.2
+B = 0.75
+PREFIX_WEIGHT = 0.7
+TYPO_WEIGHT = 0.5
+MIN_PREFIX = 2
+MIN_TYPO_LENGTH = 4
+
+SNIPPET_CHARS = 160
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9_]+", str(text).lower())
+
+
+def _delete_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _deletes(term):
+    """The term with each single character removed."""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _one_edit(a, b):
+    """True if b is one insertion, deletion, substitution or adjacent swap away from a."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        if len(diffs) == 2 and diffs[1] == diffs[0] + 1:
+            return a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+        return len(diffs) == 1
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _align(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def _snippet(paragraphs):
+    text = " ".join(p.replace("**", "") for p in paragraphs)
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+
+
+def _documents(store):
+    """(kind, topic, reference, title, snippet, weighted term counts) for every lesson and question."""
+    for topic in TOPICS:
+        for lesson in store.lessons_by_topic[topic]:
+            title = lesson.get("title") or lesson.get("lessonTitle") or topic
+            body = [p for field in LESSON_BODY_FIELDS for p in _flatten(lesson.get(field))]
+            concepts = [p for field in LESSON_CONCEPT_FIELDS for p in _flatten(lesson.get(field))]
+            for section in lesson.get("sections") or []:
+                if isinstance(section, dict):
+                    concepts.extend(_flatten(section.get("key_concepts")))
+            terms = Counter()
+            for token in tokenize(title):
+                terms[token] += TITLE_WEIGHT
+            for token in tokenize(" ".join(concepts)):
+                terms[token] += CONCEPT_WEIGHT
+            for token in tokenize(" ".join(body)):
+                terms[token] += BODY_WEIGHT
+            yield LESSON, topic, lesson_id(lesson), title, _snippet(body), terms
+        for question in store.question_pool(topic):
+            terms = Counter()
+            for token in tokenize(question["question"]):
+                terms[token] += TITLE_WEIGHT
+            # The answer is searchable too; the distractor options would only add noise
+            for token in tokenize(question["answer"]):
+                terms[token] += BODY_WEIGHT
+            yield QUESTION, topic, question["id"], question["question"], f"Quiz: {topic}", terms
+
+
+def build_search_index(lessons_file=MASTER_LESSONS_FILE, quizzes_file=MASTER_QUIZZES_FILE,
+                       out_file=SEARCH_INDEX_FILE):
+    """Builds the inverted index over lesson and quiz text and writes it to `out_file`."""
+    store = ContentStore(lessons_file, quizzes_file)
+    strings = []
+
+    def add_string(text):
+        strings.append(text.encode("utf-8"))
+        return len(strings) - 1
+
+    doc_records = []
+    doc_terms = []
+    for kind, topic, reference, title, snippet, terms in _documents(store):
+        doc_records.append((kind, TOPICS.index(topic), add_string(reference), add_string(title), add_string(snippet)))
+        doc_terms.append(terms)
+
+    # Posting lists with the BM25 impact of each (term, doc) pair precomputed
+    lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float64)
+    average_length = lengths.mean() if len(lengths) else 1.0
+    postings = {}
+    for doc, terms in enumerate(doc_terms):
+        norm = K1 * (1 - B + B * lengths[doc] / average_length)
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc, tf * (K1 + 1) / (tf + norm)))
+
+    vocabulary = sorted(postings)
+    n_docs = len(doc_records)
+    term_records = []
+    posting_docs = []
+    posting_impacts = []
+    for term in vocabulary:
+        entries = postings[term]
+        idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+        term_records.append((add_string(term), len(posting_docs), len(entries)))
+        posting_docs.extend(doc for doc, _ in entries)
+        posting_impacts.extend(idf * impact for _, impact in entries)
+
+    # A typo of `term` shares a deletion variant with it (or is one), so store the term and its deletions
+    deletes = sorted(
+        (_delete_hash(variant), t)
+        for t, term in enumerate(vocabulary) if len(term) >= MIN_TYPO_LENGTH - 1
+        for variant in _deletes(term) | {term}
+    )
+
+    offsets = [0]
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+
+    # Write to a temp file and rename so readers never map a half-written index;
+    # each builder gets its own temp file, so concurrent rebuilds don't collide
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(out_file) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n_docs, len(term_records), len(posting_docs), len(deletes), len(strings)))
+        docs = np.zeros(n_docs, dtype=DOC_DTYPE)
+        for doc, (kind, topic, reference, title, snippet) in enumerate(doc_records):
+            docs[doc] = (kind, topic, b"\0\0", reference, title, snippet)
+        f.write(docs.tobytes())
+        _align(f)
+        f.write(np.array(term_records, dtype=np.uint32).reshape(-1, 3).astype("<u4").tobytes())
+        _align(f)
+        f.write(np.array(posting_docs, dtype="<u4").tobytes())
+        f.write(np.array(posting_impacts, dtype="<f4").tobytes())
+        _align(f)
+        f.write(np.array([h for h, _ in deletes], dtype="<u8").tobytes())
+        f.write(np.array([t for _, t in deletes], dtype="<u4").tobytes())
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        for data in strings:
+            f.write(data)
+    os.chmod(tmp_file, 0o644)
+    os.replace(tmp_file, out_file)
+    return out_file
+
+
+def _built_version(index_file):
+    with open(index_file, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:4] != MAGIC:
+        return None
+    return HEADER.unpack(header)[1]
+
+
+def ensure_search_index(lessons_file=MASTER_LESSONS_FILE, quizzes_file=MASTER_QUIZZES_FILE,
+                        index_file=SEARCH_INDEX_FILE):
+    """Rebuilds the index if it is missing, older than either master file or in an older format."""
+    sources = [path for path in (lessons_file, quizzes_file) if os.path.exists(path)]
+    if (not os.path.exists(index_file)
+            or any(os.path.getmtime(index_file) < os.path.getmtime(path) for path in sources)
+            or _built_version(index_file) != VERSION):
+        build_search_index(lessons_file, quizzes_file, index_file)
+    return index_file
+
+
+class _Vocabulary:
+    """Sorted term list decoded lazily from the mmap, so bisect only touches ~log2(n) terms."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index.terms)
+
+    def __getitem__(self, t):
+        return self.index._string(int(self.index.terms[t]["string"]))
+
+
+class SearchIndex:
+    """
+    Read-only, memory-mapped view of a prebuilt search index.
+    Posting lists, term table and typo table are NumPy views over the mapped
+    pages; only the top results' titles and snippets are decoded.
+    """
+
+    def __init__(self, index_file=SEARCH_INDEX_FILE):
+        with open(index_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_docs, n_terms, n_postings, n_deletes, n_strings = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{index_file} is not a version {VERSION} search index")
+
+        self.n_docs = n_docs
+        self.docs = np.frombuffer(self._mm, dtype=DOC_DTYPE, count=n_docs, offset=HEADER.size)
+        position = HEADER.size + n_docs * DOC_DTYPE.itemsize
+        position += -position % 8
+        self.terms = np.frombuffer(self._mm, dtype=TERM_DTYPE, count=n_terms, offset=position)
+        position += n_terms * TERM_DTYPE.itemsize
+        position += -position % 8
+        self.posting_docs = np.frombuffer(self._mm, dtype="<u4", count=n_postings, offset=position)
+        position += n_postings * 4
+        self.posting_impacts = np.frombuffer(self._mm, dtype="<f4", count=n_postings, offset=position)
+        position += n_postings * 4
+        position += -position % 8
+        self.delete_hashes = np.frombuffer(self._mm, dtype="<u8", count=n_deletes, offset=position)
+        position += n_deletes * 8
+        self.delete_terms = np.frombuffer(self._mm, dtype="<u4", count=n_deletes, offset=position)
+        position += n_deletes * 4
+        self._offsets_at = position
+        self._blob_at = position + (n_strings + 1) * OFFSET.size
+        self.vocabulary = _Vocabulary(self)
+
+    def _string(self, index):
+        start, end = struct.unpack_from("<II", self._mm, self._offsets_at + index * OFFSET.size)
+        return str(self._mm[self._blob_at + start:self._blob_at + end], "utf-8")
+
+    def document(self, doc):
+        record = self.docs[doc]
+        return {
+            "kind": "lesson" if record["kind"] == LESSON else "question",
+            "topic": TOPICS[record["topic"]],
+            "ref": self._string(int(record["reference"])),
+            "title": self._string(int(record["title"])),
+            "snippet": self._string(int(record["snippet"]))
+        }
+
+    def _exact(self, token):
+        t = bisect.bisect_left(self.vocabulary, token)
+        return t if t < len(self.vocabulary) and self.vocabulary[t] == token else None
+
+    def _prefix_range(self, token):
+        first = bisect.bisect_left(self.vocabulary, token)
+        last = bisect.bisect_left(self.vocabulary, token + "\uffff", lo=first)
+        return range(first, last)
+
+    def _typos(self, token):
+        """Terms within one insertion, deletion, substitution or adjacent swap of `token`."""
+        candidates = set()
+        for variant in _deletes(token) | {token}:
+            h = np.uint64(_delete_hash(variant))
+            start = np.searchsorted(self.delete_hashes, h, side="left")
+            end = np.searchsorted(self.delete_hashes, h, side="right")
+            candidates.update(int(t) for t in self.delete_terms[start:end])
+        # Hash collisions and two-edit neighbours (both strings lost a character) are filtered here
+        return [t for t in candidates if _one_edit(token, self.vocabulary[t])]
+
+    def _term_matches(self, token, is_last):
+        """(term number, weight) pairs a query token matches."""
+        matches = {}
+        exact = self._exact(token)
+        if exact is not None:
+            matches[exact] = 1.0
+        # The word being typed (the last one) also matches as a prefix
+        if is_last and len(token) >= MIN_PREFIX:
+            for t in self._prefix_range(token):
+                matches.setdefault(t, PREFIX_WEIGHT)
+        # Plurals count as exact matches ("loop" finds "loops")
+        for plural in (token + "s", token + "es"):
+            t = self._exact(plural)
+            if t is not None:
+                matches[t] = 1.0
+        if not matches and len(token) >= MIN_TYPO_LENGTH:
+            for t in self._typos(token):
+                matches.setdefault(t, TYPO_WEIGHT)
+        return matches
+
+    def search(self, query, k=10, kind=None):
+        """Top-k documents for a query, best first; kind ("lesson"/"question") filters results."""
+        tokens = tokenize(query)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for i, token in enumerate(tokens):
+            matches = self._term_matches(token, i == len(tokens) - 1)
+            token_scores = np.zeros(self.n_docs, dtype=np.float32)
+            for t, weight in matches.items():
+                _, start, count = self.terms[t]
+                docs = self.posting_docs[start:start + count]
+                # A token scores a document once, through its best-matching term
+                np.maximum.at(token_scores, docs, weight * self.posting_impacts[start:start + count])
+            scores += token_scores
+
+        if kind is not None:
+            scores[self.docs["kind"] != (LESSON if kind == "lesson" else QUESTION)] = 0
+        hits = np.flatnonzero(scores)
+        if len(hits) == 0:
+            return []
+        # Regenerated content repeats titles (e.g. the same question with other options); show each once
+        results = []
+        seen_titles = set()
+        for doc in hits[np.argsort(-scores[hits], kind="stable")]:
+            result = self.document(int(doc))
+            key = (result["kind"], normalize_text(result["title"]))
+            if key in seen_titles:
+                continue
+            seen_titles.add(key)
+            result["score"] = float(scores[doc])
+            results.append(result)
+            if len(results) == k:
+                break
+        return results
+
+    def close(self):
+        self._mm.close()
+
+
+if __name__ == "__main__":
+    path = build_search_index()
+    index = SearchIndex(path)
+    print(f"Indexed {index.n_docs} documents, {len(index.terms)} terms into {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,189 @@
+import json
+import re
+import time
+
+# Accepted shape of a quiz question
+MIN_OPTIONS = 2
+MAX_OPTIONS = 6
+OPTION_LETTERS = "ABCDEF"
+
+
+def _option_list(options):
+    """Options as a list of strings; accepts {"A": "...", ...} dicts too."""
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    if not isinstance(options, list):
+        return None
+    return [str(option).strip() for option in options]
+
+
+def _resolve_answer(answer, options):
+    """Maps an answer given as text, letter ("B", "b)") or index onto the option text."""
+    if isinstance(answer, int) and 0 <= answer < len(options):
+        return options[answer]
+    answer = str(answer).strip()
+    if answer in options:
+        return answer
+    lowered = [option.lower() for option in options]
+    if answer.lower() in lowered:
+        return options[lowered.index(answer.lower())]
+    letter = re.fullmatch(r"(?:option\s*)?([A-Fa-f])[\).:]?(?:\s+(.*))?", answer)
+    if letter:
+        index = OPTION_LETTERS.index(letter.group(1).upper())
+        if index < len(options):
+            return options[index]
+    return None
+
+
+def validate_question(raw):
+    """
+    Checks one generated question against the quiz schema.
+    Returns (question, repaired) where question is None if it can't be fixed.
+    Repairs: "correct_answer" -> "answer", options given as a dict, answers given
+    as a letter/index or with different case/whitespace than the option.
+    """
+    if not isinstance(raw, dict):
+        return None, False
+    repaired = False
+    question = raw.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return None, False
+
+    options = _option_list(raw.get("options"))
+    if options is None or not MIN_OPTIONS <= len(options) <= MAX_OPTIONS or not all(options):
+        return None, False
+    if len(set(options)) != len(options):
+        return None, False
+    if isinstance(raw.get("options"), dict):
+        repaired = True
+
+    if "answer" in raw:
+        answer = raw["answer"]
+    elif "correct_answer" in raw:
+        answer, repaired = raw["correct_answer"], True
+    else:
+        return None, False
+    resolved = _resolve_answer(answer, options)
+    if resolved is None:
+        return None, False
+    if resolved != answer:
+        repaired = True
+
+    return {"question": question.strip(), "options": options, "answer": resolved}, repaired
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for a streamed quiz response.
+    feed() takes text chunks as they arrive and returns the question objects
+    that completed in that chunk, already validated. Text outside the
+    "questions" array (code fences, comments, the title) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.in_array = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.title = None
+        self.stats = {"bytes": 0, "accepted": 0, "repaired": 0, "rejected": 0}
+
+    def _start_array(self):
+        match = re.search(r'"questions"\s*:\s*\[', self.buffer)
+        if match is None:
+            return False
+        title = re.search(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"', self.buffer[:match.start()])
+        if title:
+            self.title = json.loads(f'"{title.group(1)}"')
+        self.in_array = True
+        self.position = match.end()
+        return True
+
+    def feed(self, chunk):
+        self.stats["bytes"] += len(chunk.encode("utf-8"))
+        self.buffer += chunk
+        if not self.in_array and not self._start_array():
+            return []
+
+        completed = []
+        buffer = self.buffer
+        i = self.position
+        while i < len(buffer):
+            char = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "/" and self.depth == 0 and i + 1 == len(buffer):
+                break  # May be the start of a "//" comment; wait for the next character
+            elif char == "/" and self.depth == 0 and buffer.startswith("//", i):
+                newline = buffer.find("\n", i)
+                if newline == -1:
+                    break  # Wait for the rest of the comment
+                i = newline
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = i
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    completed.extend(self._emit(buffer[self.object_start:i + 1]))
+                    self.object_start = None
+            elif char == "]" and self.depth == 0:
+                self.in_array = False
+                i += 1
+                break
+            i += 1
+
+        # Drop consumed text, keeping any object that is still arriving
+        keep_from = self.object_start if self.object_start is not None else i
+        self.buffer = buffer[keep_from:]
+        if self.object_start is not None:
+            self.object_start = 0
+        self.position = i - keep_from
+        if not self.in_array and self.depth == 0:
+            self.buffer = ""
+            self.position = 0
+        return completed
+
+    def _emit(self, text):
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError:
+            self.stats["rejected"] += 1
+            return []
+        question, repaired = validate_question(raw)
+        if question is None:
+            self.stats["rejected"] += 1
+            return []
+        self.stats["accepted"] += 1
+        self.stats["repaired"] += repaired
+        return [question]
+
+
+def ingest_quiz_stream(chunks, default_title):
+    """
+    Consumes streamed text chunks and returns (quiz, stats).
+    stats has byte/question counts, rejections and parse throughput.
+    """
+    parser = QuestionStreamParser()
+    questions = []
+    start = time.perf_counter()
+    parse_time = 0.0
+    for chunk in chunks:
+        parse_start = time.perf_counter()
+        questions.extend(parser.feed(chunk))
+        parse_time += time.perf_counter() - parse_start
+    stats = dict(parser.stats)
+    stats["seconds"] = time.perf_counter() - start
+    stats["parse_mb_per_s"] = stats["bytes"] / parse_time / 1e6 if parse_time else 0.0
+    return {"title": parser.title or default_title, "questions": questions}, stats
@@ -0,0 +1,63 @@
+from stream_ingest import QuestionStreamParser
+
+# A response that copies the quiz prompt's template (gemini.quiz_prompt), "//" comments included
+TEMPLATE_RESPONSE = """```json
+{
+  "title": "Loops Quiz",
+  "questions": [
+    {
+      "question": "Question 1: Enter question text here",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Option A"
+    },
+    {
+      "question": "Question 2: Enter question text here",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Option A"
+    },
+    {
+      "question": "Question 3: Enter question text here",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Option A"
+    },
+    {
+      "question": "Question 4: Enter question text here",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Option A"
+    },
+    {
+      "question": "Question 5: Enter question text here",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Option A"
+    },
+    // The quiz should continue with question 6 through question 50.
+    // **Important:** Do not include any ellipses or commentary {like this}; the output must list 50 "complete" question objects.
+  ]
+}
+```"""
+
+
+def parse_in_chunks(text, size):
+    parser = QuestionStreamParser()
+    questions = []
+    for start in range(0, len(text), size):
+        questions.extend(parser.feed(text[start:start + size]))
+    return parser, questions
+
+
+def test_template_response_at_every_chunk_size():
+    expected = [f"Question {n}: Enter question text here" for n in range(1, 6)]
+    for size in range(1, len(TEMPLATE_RESPONSE) + 1):
+        parser, questions = parse_in_chunks(TEMPLATE_RESPONSE, size)
+        assert [q["question"] for q in questions] == expected, f"chunk size {size}"
+        assert all(q["answer"] == "Option A" for q in questions), f"chunk size {size}"
+        assert parser.title == "Loops Quiz", f"chunk size {size}"
+        assert parser.stats["rejected"] == 0, f"chunk size {size}"
+        assert not parser.in_array and parser.depth == 0 and not parser.in_string, f"chunk size {size}"
+
+
+def test_slash_outside_comment_is_skipped():
+    text = '{"questions": [ / {"question": "Q?", "options": ["a", "b"], "answer": "a"}]}'
+    for size in range(1, len(text) + 1):
+        _, questions = parse_in_chunks(text, size)
+        assert [q["question"] for q in questions] == ["Q?"], f"chunk size {size}"